@@ -0,0 +1,5 @@
+#!./venv/bin/python3.10
+from lib import *
+
+if __name__ == '__main__':
+    run_backfill()
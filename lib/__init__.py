@@ -1,22 +1,32 @@
 # import path from sys
-from sys import path, exc_info
-from __main__ import __file__
+from sys import path, exc_info, modules as _modules
 from os.path import basename
 
 # add the lib directory so that python will search it for modules
 path.append('./lib')
 
-match basename(__file__):
+# the script being run. Worker processes started with forkserver (see ScorePool) run it again as __mp_main__
+_main = _modules.get('__mp_main__') or _modules['__main__']
+
+match basename(_main.__file__):
     case 'run_bot.py':
         # imports required to run bot
         from random import randint
+        from typing import Literal
         from discord import Interaction, Attachment, app_commands
         from wordlebot import *
         from credentials import bot_token, server_id
         from logdatabase import LogUpdate
+        from stages import StageTrace
 
     case 'setup.py':
         from env_setup import *
 
     case 'read_logs.py':
         from logdatabase import LogReader
+
+    case 'benchmark.py':
+        from ocrbench import run_benchmark
+
+    case 'backfill.py':
+        from gamebackfill import run_backfill
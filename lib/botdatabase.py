@@ -1,12 +1,26 @@
-from sqlite3 import connect
+from sqlite3 import connect, Connection
 from os.path import exists
-from datetime import datetime
+from datetime import datetime, date, timedelta
 from dataclasses import dataclass
 from atexit import register
+from asyncio import get_running_loop, Future, TimerHandle
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from threading import local
+from collections import OrderedDict
+from random import randint
 from typing import Tuple
 
+# pip modules
+import numpy as np
+
+# import local modules
+from scoring import encode
+from wotd import FIRST_WORDLE
+from leaderboard import Leaderboard, CURRENT_RANKINGS, LEADERBOARD_SIZE, LEADERBOARD_MIN_GAMES, streak_cutoff
+
 # objects needed by wordle bot
-__all__ = ['DoubleSubmit', 'BaseStats', 'FullStats', 'BotDatabase']
+__all__ = ['DoubleSubmit', 'IncompleteHistory', 'BaseStats', 'FullStats', 'WindowStats', 'BotDatabase', 'AsyncBotDatabase', 'PERIODS']
 
 # set DBLSUB_DISABLED to True if you want to ignore double submits
 DBLSUB_DISABLED = False
@@ -14,6 +28,228 @@ DBLSUB_DISABLED = False
 # path to the database
 DB_PATH = './lib/bot_database/stats.db'
 
+# path to the leaderboard saved when the database is closed
+LEADERBOARD_PATH = './lib/bot_database/leaderboard.pickle'
+
+# day 0 of the day numbers stored with every game (1970-01-01)
+EPOCH = date(1970, 1, 1)
+
+# history of every game submitted, created in databases that predate it as well.
+# Rows are clustered by (username, day), so a user's games over any range of days are one range
+# scan of the table itself, and the day index covers every user's game on a day (in a WITHOUT ROWID
+# table an index carries the primary key).
+# - day: days since EPOCH
+# - wordle: number of the puzzle
+# - guesses: letter codes (a=0 ... z=25), 5 per row. NULL if only the tiles are known (shares)
+# - scores: score codes (see scoring.py), 5 per row
+GAMES_SCHEMA = '''
+    CREATE TABLE IF NOT EXISTS Games (
+        username varchar,
+        day int,
+        wordle int,
+        guesses blob,
+        scores blob,
+        PRIMARY KEY (username, day)
+        ) WITHOUT ROWID;
+    CREATE INDEX IF NOT EXISTS Games_day ON Games (day);'''
+
+# totals of every user's games, rolled up per day and per current period (see PERIODS).
+# merge_games rebuilds a user's totals from their Daily rows, and any range of days is a range sum over them. Periods hold the running totals of the
+# period each user last played in, starting over when a game lands in a later one.
+# - day / start: days since EPOCH
+WINDOW_SCHEMA = '''
+    CREATE TABLE IF NOT EXISTS Daily (
+        username varchar,
+        day int,
+        games int,
+        wins int,
+        guesses int,
+        greens int,
+        yellows int,
+        uniques int,
+        PRIMARY KEY (username, day)
+        ) WITHOUT ROWID;
+    CREATE TABLE IF NOT EXISTS Periods (
+        username varchar,
+        period varchar,
+        start int,
+        games int,
+        wins int,
+        guesses int,
+        greens int,
+        yellows int,
+        uniques int,
+        PRIMARY KEY (username, period)
+        ) WITHOUT ROWID;'''
+
+# periods with running totals
+PERIODS = ('week', 'month', 'season')
+
+# seasons are this many months long, the first one of the year starting in SEASON_FIRST_MONTH
+SEASON_MONTHS = 3
+SEASON_FIRST_MONTH = 1
+
+# User_Stats was created without a key, so its rows are found through this index
+STATS_SCHEMA = '''
+    CREATE INDEX IF NOT EXISTS User_Stats_username ON User_Stats (username);'''
+
+# indexes matching the rankings (see leaderboard.py), so they can be read in order without sorting
+RANKING_SCHEMA = f'''
+    CREATE INDEX IF NOT EXISTS User_Data_win_rate ON User_Data (CAST(wins AS REAL) / games DESC, username) WHERE games >= {LEADERBOARD_MIN_GAMES};
+    CREATE INDEX IF NOT EXISTS User_Data_avg_guesses ON User_Data (CAST(guesses AS REAL) / games, username) WHERE games >= {LEADERBOARD_MIN_GAMES};
+    DROP INDEX IF EXISTS User_Data_streak;
+    CREATE INDEX IF NOT EXISTS User_Data_current_streak ON User_Data (curr_streak DESC, username, last_win) WHERE curr_streak > 0;
+    CREATE INDEX IF NOT EXISTS User_Data_max_streak ON User_Data (max_streak DESC, username) WHERE max_streak > 0;'''
+
+# every ranking in order, as the (sort value, username) keys Leaderboard keeps. These must rank
+# exactly like RANKINGS does. Current rankings take the oldest last win a current streak can have,
+# and add each player's last win.
+RANKING_QUERIES = {
+    'win_rate': f'''
+        SELECT -(CAST(wins AS REAL) / games), username FROM User_Data WHERE games >= {LEADERBOARD_MIN_GAMES}
+        ORDER BY CAST(wins AS REAL) / games DESC, username;''',
+    'avg_guesses': f'''
+        SELECT CAST(guesses AS REAL) / games, username FROM User_Data WHERE games >= {LEADERBOARD_MIN_GAMES}
+        ORDER BY CAST(guesses AS REAL) / games, username;''',
+    'streak': '''
+        SELECT -curr_streak, username, last_win FROM User_Data WHERE curr_streak > 0 AND last_win >= ?
+        ORDER BY curr_streak DESC, username;''',
+    'max_streak': '''
+        SELECT -max_streak, username FROM User_Data WHERE max_streak > 0
+        ORDER BY max_streak DESC, username;''',
+}
+
+# number of read-only connections serving stats while the writer commits
+DB_READERS = 2
+
+# settings of every connection: memory mapped reads (256 MiB) and a 16 MiB page cache
+DB_PRAGMAS = {'mmap_size': 256 * 2**20, 'cache_size': -16 * 2**10, 'temp_store': 'MEMORY'}
+
+# journal of the database. With a write-ahead log readers never wait on the writer, and a commit
+# is a single append to the log
+DB_JOURNAL_MODE = 'WAL'
+
+# when commits reach the disk. NORMAL only syncs the log at checkpoints, which in WAL mode can lose
+# the last commits on power loss but never corrupts the database. FULL syncs on every commit.
+DB_SYNCHRONOUS = 'NORMAL'
+
+# length of the longest bar of the guess distribution chart, in half blocks
+BAR_HALVES = 12
+
+# number of users whose User_Data row is kept in memory by the writer, and whose full stats are kept by AsyncBotDatabase
+DB_CACHE_SIZE = 4096
+
+# seconds submissions wait for others to share a commit with (0 commits each on its own)
+DB_GROUP_WINDOW = 0.005
+
+# columns of the guess distribution: number of games won in 1 ... 6 guesses
+DISTRO_COLUMNS = ', '.join(f'distro_{n}' for n in range(1, 7))
+
+# statements used on every submission. They take parameters so sqlite3 can keep them prepared
+# (it caches statements by their text) and usernames are never pasted into the SQL.
+# everything a submission needs to know about the user, including when they last submitted
+SELECT_USER = f'''
+    SELECT
+        last_submit, games, wins, guesses, greens, yellows, uniques,
+        {DISTRO_COLUMNS}, last_win, curr_streak, max_streak
+    FROM
+        User_Data
+    WHERE
+        username = ?;'''
+
+# write back a returning user's totals. The distribution is counted up in place, by 1 in the column of a win.
+UPDATE_DATA = '''
+    UPDATE User_Data SET
+        games = ?, wins = ?, guesses = ?, greens = ?, yellows = ?, uniques = ?,
+        distro_1 = distro_1 + ?, distro_2 = distro_2 + ?, distro_3 = distro_3 + ?,
+        distro_4 = distro_4 + ?, distro_5 = distro_5 + ?, distro_6 = distro_6 + ?,
+        last_win = ?, curr_streak = ?, max_streak = ?, last_submit = ?
+    WHERE
+        username = ?;'''
+
+# write back a returning user's rates
+UPDATE_STATS = '''
+    UPDATE User_Stats SET
+        win_rate = ?, avg_guesses = ?, green_rate = ?, yellow_rate = ?
+    WHERE
+        username = ?;'''
+
+# add a new user's totals
+INSERT_DATA = f'''
+    INSERT INTO User_Data (
+        username, games, wins, guesses, greens, yellows, uniques,
+        {DISTRO_COLUMNS}, last_win, last_submit, curr_streak, max_streak)
+    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?);'''
+
+# add a new user's rates
+INSERT_STATS = '''
+    INSERT INTO User_Stats (
+        username, win_rate, avg_guesses, green_rate, yellow_rate)
+    VALUES (?, ?, ?, ?, ?);'''
+
+# record a game. Replacing only happens when double submits are allowed (DBLSUB_DISABLED)
+INSERT_GAME = '''
+    INSERT OR REPLACE INTO Games (username, day, wordle, guesses, scores)
+    VALUES (?, ?, ?, ?, ?);'''
+
+# count a game in its day
+ADD_DAILY = '''
+    INSERT INTO Daily (username, day, games, wins, guesses, greens, yellows, uniques)
+    VALUES (?, ?, 1, ?, ?, ?, ?, ?)
+    ON CONFLICT (username, day) DO UPDATE SET
+        games = games + 1, wins = wins + excluded.wins, guesses = guesses + excluded.guesses,
+        greens = greens + excluded.greens, yellows = yellows + excluded.yellows, uniques = uniques + excluded.uniques;'''
+
+# count a game in every current period, starting a period over once a game falls in a later one.
+# Games from before a user's current period (e.g. imported ones) are only kept in Daily.
+_period_totals = ', '.join(
+    f'{column} = CASE WHEN start = excluded.start THEN {column} ELSE 0 END + excluded.{column}'
+    for column in ('games', 'wins', 'guesses', 'greens', 'yellows', 'uniques'))
+ADD_PERIODS = f'''
+    INSERT INTO Periods (username, period, start, games, wins, guesses, greens, yellows, uniques)
+    VALUES {', '.join(['(?, ?, ?, 1, ?, ?, ?, ?, ?)'] * len(PERIODS))}
+    ON CONFLICT (username, period) DO UPDATE SET
+        {_period_totals}, start = excluded.start
+    WHERE
+        excluded.start >= start;'''
+
+# a user's totals in a period
+SELECT_PERIOD = '''
+    SELECT
+        start, games, wins, guesses, greens, yellows, uniques
+    FROM
+        Periods
+    WHERE
+        username = ? AND period = ?;'''
+
+# every day a user played, to rebuild their totals from
+SELECT_HISTORY = '''
+    SELECT
+        day, games, wins, guesses, greens, yellows, uniques
+    FROM
+        Daily
+    WHERE
+        username = ?
+    ORDER BY
+        day;'''
+
+# forget a user's totals and rollups before they are rebuilt. Their Games rows are kept.
+DELETE_USER = (
+    'DELETE FROM User_Stats WHERE username = ?;',
+    'DELETE FROM User_Data WHERE username = ?;',
+    'DELETE FROM Daily WHERE username = ?;',
+    'DELETE FROM Periods WHERE username = ?;')
+
+# all of a user's stats
+SELECT_FULL_STATS = f'''
+    SELECT
+        games, wins, guesses, greens, yellows, uniques, {DISTRO_COLUMNS}, last_win,
+        curr_streak, max_streak, win_rate, avg_guesses, green_rate, yellow_rate
+    FROM
+        User_Data JOIN User_Stats ON User_Stats.username = User_Data.username
+    WHERE
+        User_Data.username = ?;'''
+
 class DoubleSubmit(Exception):
     '''Exception raised if user attempts to submit twice on the same day'''
     
@@ -23,6 +259,15 @@ class DoubleSubmit(Exception):
         self.message = 'You already submit today\'s game :)'
 
 
+class IncompleteHistory(Exception):
+    '''Exception raised if older games are merged for a user who played before every game was counted in Daily'''
+
+    def __init__(self, username) -> None:
+        super().__init__(username)
+        self.username = username
+        self.message = f'{username} has games from before daily totals were kept, their totals cannot be rebuilt'
+
+
 ################################################################################################################################################
 # BaseStats class:
 # used to store a user's base stats
@@ -39,7 +284,7 @@ class BaseStats:
     - streak
     - max streak"""
 
-    guess_distro: str | dict
+    guess_distro: tuple[int, ...] | str
     games_played: int
     win_rate: float
     streak: int
@@ -49,29 +294,20 @@ class BaseStats:
         # multiply win_rate to convert to %
         self.win_rate *= 100
 
-        # Convert guess distribution from str to dict
-        # self.guess_distro = {
-        #     k: v
-        #     for k,v in zip(
-        #         range(1,7),
-        #         map(int, self.guess_distro.split())) }
-
         self.WHOLE = '█'
         self.HALF = '▌'
 
-        farb = {
-            1: self.HALF,
-            2: self.WHOLE,
-            3: self.WHOLE + self.HALF,
-            4: self.WHOLE * 2,
-            5: self.WHOLE * 2 + self.HALF,
-            6: self.WHOLE * 3
-        }
+        # Convert guess distribution from counts to a bar chart, the longest bar is BAR_HALVES half blocks long
+        self.distro = tuple(self.guess_distro)
+        most = max(max(self.distro), 1)
 
-        asdf = ''
-        for i, v in enumerate(farb.values()):
-            asdf += '`' + str(i+1) + ':' + v + '`\n'
-        self.guess_distro = f'{asdf}'
+        chart = ''
+        for guesses, count in enumerate(self.distro, 1):
+            # a guess count that was ever won with gets at least half a block
+            halves = max(round(count / most * BAR_HALVES), count > 0)
+            bar = self.WHOLE * (halves // 2) + self.HALF * (halves % 2)
+            chart += '`' + str(guesses) + ':' + bar.ljust(BAR_HALVES // 2) + '` ' + str(count) + '\n'
+        self.guess_distro = chart
 
 ################################################################################################################################################
 # FullStats class:
@@ -105,7 +341,7 @@ class FullStats(BaseStats):
         total_greens, \
         total_yellows, \
         uniques, \
-        distro_str, \
+        *distro, \
         last_win, \
         streak, \
         max_streak, \
@@ -115,7 +351,7 @@ class FullStats(BaseStats):
         yellow_rate = raw
 
         # initialize BaseStats members
-        super().__init__(distro_str, games_played, win_rate, streak, max_streak)
+        super().__init__(distro, games_played, win_rate, streak, max_streak)
 
         # initialize the FullStats fields
         self.total_wins = int(total_wins)
@@ -126,7 +362,68 @@ class FullStats(BaseStats):
         self.avg_guesses = float(avg_guesses)
         self.green_rate = float(green_rate) * 100
         self.yellow_rate = float(yellow_rate) * 100
-        self.last_win = datetime.strptime(str(last_win), '%Y%m%d').date()
+        self.last_win = datetime.strptime(str(last_win), '%Y%m%d').date() if last_win else None
+
+################################################################################################################################################
+# WindowStats class:
+# used to store a user's stats over a range of days
+################################################################################################################################################
+@dataclass
+class WindowStats:
+    """
+    Totals of the games played between two days (both included).
+    
+    ---
+    - first / last day
+    - \# games played, wins, guesses, greens, yellows, uniques
+    - win rate, average \# of guesses, green rate and yellow rate (rates in %)"""
+
+    first: date
+    last: date
+    games: int = 0
+    wins: int = 0
+    guesses: int = 0
+    greens: int = 0
+    yellows: int = 0
+    uniques: int = 0
+
+    @property
+    def win_rate(self) -> float:
+        return 100 * self.wins / self.games if self.games else 0.0
+
+    @property
+    def avg_guesses(self) -> float:
+        return self.guesses / self.games if self.games else 0.0
+
+    @property
+    def green_rate(self) -> float:
+        return 100 * self.greens / self.uniques if self.uniques else 0.0
+
+    @property
+    def yellow_rate(self) -> float:
+        return 100 * self.yellows / self.uniques if self.uniques else 0.0
+
+
+# first day of the period (see PERIODS) a day falls in
+def period_start(period:str, day:date) -> date:
+    match period:
+        case 'week':
+            return day - timedelta(days=day.weekday())
+        case 'month':
+            return day.replace(day=1)
+        case 'season':
+            # count months from January of year 0, starting at 0, and step back to the last month a season starts in
+            months = day.year * 12 + day.month - 1
+            start = months - (months - (SEASON_FIRST_MONTH - 1)) % SEASON_MONTHS
+            year, month = divmod(start, 12)
+            return date(year, month + 1, 1)
+
+    raise ValueError(f'Unknown period: {period}')
+
+
+# day number of a YYYYMMDD int, so consecutive days differ by 1 across months and years
+def _ordinal(yyyymmdd:int) -> int:
+    return datetime.strptime(str(yyyymmdd), '%Y%m%d').toordinal()
 
 ################################################################################################################################################
 # Updatevalues class:
@@ -136,7 +433,7 @@ class UpdateValues:
     def __init__(self, raw:Tuple, win:bool, guesses:int, greens:int, yellows:int, uniques:int, date:int) -> None:
         
         # extract fields from tuple
-        _games, _wins, _guesses, _greens, _yellows, _uniques, _distro_str, _last_win, _curr_streak, _max_streak = raw
+        _games, _wins, _guesses, _greens, _yellows, _uniques, *_distro, _last_win, _curr_streak, _max_streak = raw
 
 
         # games update value
@@ -165,7 +462,7 @@ class UpdateValues:
         # increment streak if user has solved consecutively; otherwise streak will not be incremented
         # else set streak to 1 if this is the start of a new streak
         if win:
-            if date - _last_win == 1:
+            if _last_win and _ordinal(date) - _ordinal(_last_win) == 1:
                 self._streak_update = _curr_streak + 1
             else:
                 self._streak_update = 1
@@ -179,20 +476,9 @@ class UpdateValues:
         self._max_update = self._streak_update if self._streak_update > _max_streak else _max_streak
 
 
-        # if they win, update the guess distribution
-        if win:
-            # convert string to dictionary
-            temp_dict = dict( (k,v) for k,v in zip(range(1,7), map(int, _distro_str.split())))
-
-            # update dictionary
-            temp_dict[guesses] += 1
-
-            # convert dictionary back to string
-            self._distro_str_update = ' '.join(map(str, temp_dict.values()))
-            
-        # otherwise it stays the same
-        else:
-            self._distro_str_update = _distro_str
+        # if they win, count the game in the guess distribution; otherwise it stays the same
+        self._distro_step = tuple(int(win and guesses == n) for n in range(1, 7))
+        self._distro_update = tuple(count + step for count, step in zip(_distro, self._distro_step))
 
 
         # win rate update value
@@ -207,6 +493,25 @@ class UpdateValues:
         # yellow rate update value 
         self._yellow_rate_update = self._yellows_update / self._uniques_update
 
+################################################################################################################################################
+# UserRecord class:
+# in-memory copy of a user's User_Data row
+################################################################################################################################################
+class UserRecord:
+    '''The fields of SELECT_USER, in the same order. Slots keep thousands of them small.'''
+
+    __slots__ = ('last_submit', 'games', 'wins', 'guesses', 'greens', 'yellows', 'uniques',
+                 'distro_1', 'distro_2', 'distro_3', 'distro_4', 'distro_5', 'distro_6',
+                 'last_win', 'curr_streak', 'max_streak')
+
+    def __init__(self, raw:Tuple) -> None:
+        for name, value in zip(self.__slots__, raw):
+            setattr(self, name, value)
+
+    def fields(self) -> Tuple:
+        # the fields UpdateValues needs, everything but last_submit
+        return tuple(getattr(self, name) for name in self.__slots__[1:])
+
 ################################################################################################################################################
 # BotDatabase class:
 # used to access and manipulate data in the wordle bot database
@@ -214,23 +519,39 @@ class UpdateValues:
 class BotDatabase:
     '''Database class. Contains one member _database. 
     _database is a sqlite3 database connection where data is stored.
+
+    Users who submitted recently are kept in _users, an LRU cache of UserRecords that every write goes
+    through. A returning user's double submit check and stats update are then answered from memory,
+    leaving only the writes for SQLite. The cache assumes this connection is the database's only writer.
+
+    The leaderboard is moved along with every committed submission. It is saved when the database is
+    closed, and the database is stamped so the save is only used if nothing was written since.
+    Otherwise it is rebuilt from the ranking indexes.
     '''
 
-    def __init__(self) -> None:
+    def __init__(self, synchronous:str = DB_SYNCHRONOUS, cache_size:int = DB_CACHE_SIZE) -> None:
         '''
-        BotDatabase(path:str) -> BotDatabase object with sqlite3 database stored at specified path
-        For example: BotDatabase('/path/to/database')
+        BotDatabase(synchronous:str) -> BotDatabase object with sqlite3 database stored at DB_PATH
+        For example: BotDatabase('FULL') to sync every commit to disk
         If database file already exists, it will be used as the database
         '''
 
         # make sure that database connection will be closed
         register(self.close_connection)
 
+        # users' User_Data rows, least recently used first
+        self._users: OrderedDict[str, UserRecord] = OrderedDict()
+        self._cache_size = cache_size
+
         # determine if the file at db_path already exists
         existing = exists(DB_PATH)
 
-        # initialize sqlite database at specified path
-        self._database = connect(DB_PATH)
+        # initialize sqlite database at specified path. The connection may be handed to a writer
+        # thread (see AsyncBotDatabase), which then is the only one using it
+        self._database = connect(DB_PATH, check_same_thread=False)
+        _configure(self._database)
+        self._database.execute(f'PRAGMA journal_mode = {DB_JOURNAL_MODE};')
+        self._database.execute(f'PRAGMA synchronous = {synchronous};')
 
         # if the database did not previously exist, initialize the new one
         if not existing:
@@ -246,7 +567,12 @@ class BotDatabase:
                     greens int, 
                     yellows int, 
                     uniques int, 
-                    guess_distro varchar, 
+                    distro_1 int, 
+                    distro_2 int, 
+                    distro_3 int, 
+                    distro_4 int, 
+                    distro_5 int, 
+                    distro_6 int, 
                     last_win int, 
                     last_submit int, 
                     curr_streak int, 
@@ -262,61 +588,131 @@ class BotDatabase:
                     FOREIGN KEY (username) REFERENCES User_Data(username)
                     );''')
 
-    def close_connection(self) -> None:
-        # close connection to database
-        self._database.close()
+        # tables and indexes added since the first release
+        with self._database as _cur:
+            _cur.executescript(GAMES_SCHEMA)
+            _cur.executescript(WINDOW_SCHEMA)
+
+        # databases from before the guess distribution had a column per guess count kept it as a string
+        _columns = {row[1] for row in self._database.execute('PRAGMA table_info(User_Data);')}
+        if 'distro_1' not in _columns:
+            with self._database as _cur:
+                for n in range(1, 7):
+                    _cur.execute(f'ALTER TABLE User_Data ADD COLUMN distro_{n} int DEFAULT 0;')
 
-    def _update_user(self, username:str, win:bool, guesses:int, greens:int, yellows:int, uniques:int, date:int) -> BaseStats:
+                for username, distro_str in _cur.execute('SELECT username, guess_distro FROM User_Data;').fetchall():
+                    _cur.execute(f'UPDATE User_Data SET ({DISTRO_COLUMNS}) = (?, ?, ?, ?, ?, ?) WHERE username = ?;',
+                                 (*map(int, distro_str.split()), username))
 
-        # initialize cursor
         with self._database as _cur:
+            _cur.executescript(STATS_SCHEMA)
+            _cur.executescript(RANKING_SCHEMA)
+
+        # rankings, from the last save if the database still carries its stamp
+        _stamp, = self._database.execute('PRAGMA user_version;').fetchone()
+        self.leaderboard = _stamp and Leaderboard.load(LEADERBOARD_PATH, _stamp) or self._rank_all()
 
-            # get fields needed calculate updated stats for this user
-            _raw = _cur.execute(f'''
-                SELECT
-                    games, wins, guesses, greens, yellows, uniques,
-                    guess_distro, last_win, curr_streak, max_streak
-                FROM
-                    User_Data
-                WHERE
-                    username = '{username}';
-                ''').fetchone()
-
-            # create update values object. This will calculate all the updated stats
-            vals = UpdateValues(_raw, win, guesses, greens, yellows, uniques, date)
-
-            # execute sql script to update data in database for this user
-            _cur.executescript(f'''
-                UPDATE User_Data SET games = {vals._games_update} WHERE username = '{username}';
-                UPDATE User_Data SET wins = {vals._wins_update} WHERE username = '{username}';
-                UPDATE User_Data SET guesses = {vals._guesses_update} WHERE username = '{username}';
-                UPDATE User_Data SET greens = {vals._greens_update} WHERE username = '{username}';
-                UPDATE User_Data SET yellows = {vals._yellows_update} WHERE username = '{username}';
-                UPDATE User_Data SET uniques = {vals._uniques_update} WHERE username = '{username}';
-                UPDATE User_Data SET guess_distro = '{vals._distro_str_update}' WHERE username = '{username}';
-                UPDATE User_Data SET last_win = {vals._last_win_update} WHERE username = '{username}';
-                UPDATE User_Data SET curr_streak = {vals._streak_update} WHERE username = '{username}';
-                UPDATE User_Data SET max_streak = {vals._max_update} WHERE username = '{username}';
-                UPDATE User_Data SET last_submit = {date} WHERE username = '{username}';
-                UPDATE User_Stats SET win_rate = {vals._win_rate_update} WHERE username = '{username}';
-                UPDATE User_Stats SET avg_guesses = {vals._avg_guesses_update} WHERE username = '{username}';
-                UPDATE User_Stats SET green_rate = {vals._green_rate_update} WHERE username = '{username}';
-                UPDATE User_Stats SET yellow_rate = {vals._yellow_rate_update} WHERE username = '{username}';''')
+        # anything written from now on makes the save stale, until it is saved again
+        self._database.execute('PRAGMA user_version = 0;')
+        self._closed = False
+
+        # users moved by the current transaction, ranked once it commits
+        self._ranked: list[tuple[str, Tuple]] = []
+
+    def close_connection(self) -> None:
+        # may be called more than once (on close and at exit)
+        if self._closed:
+            return
+        self._closed = True
+
+        # save the rankings, then stamp the database with the save's stamp
+        _stamp = randint(1, 2**31 - 1)
+        try:
+            self.leaderboard.save(LEADERBOARD_PATH, _stamp)
+            self._database.execute(f'PRAGMA user_version = {_stamp};')
+        except OSError:
+            pass
+
+        # close connection to database
+        self._database.close()
+
+    def _rank_all(self) -> Leaderboard:
+        # read every ranking in order through its index, current rankings without lapsed streaks
+        _order, _last_wins = {}, {}
+        for ranking, query in RANKING_QUERIES.items():
+            if ranking in CURRENT_RANKINGS:
+                _rows = self._database.execute(query, (streak_cutoff(),)).fetchall()
+                _order[ranking] = [_row[:2] for _row in _rows]
+                _last_wins.update((username, last_win) for _, username, last_win in _rows)
+            else:
+                _order[ranking] = self._database.execute(query).fetchall()
+
+        return Leaderboard(_order, _last_wins)
+
+    def _rank(self) -> None:
+        # move the users of the committed transaction on the leaderboard
+        for username, _row in self._ranked:
+            self.leaderboard.update(username, UserRecord(_row))
+        self._ranked.clear()
+
+    def _get_user(self, _cur, username:str) -> UserRecord | None:
+        # the user's row from memory, or from the database if it has not been used in a while
+        record = self._users.get(username)
+        if record is not None:
+            self._users.move_to_end(username)
+            return record
+
+        _raw = _cur.execute(SELECT_USER, (username,)).fetchone()
+        return self._put_user(username, _raw) if _raw else None
+
+    def _put_user(self, username:str, raw:Tuple) -> UserRecord:
+        # remember a user's row, forgetting the least recently used user if the cache is full
+        record = self._users[username] = UserRecord(raw)
+        self._users.move_to_end(username)
+        if len(self._users) > self._cache_size:
+            self._users.popitem(last=False)
+
+        return record
+
+    def _update_user(self, _cur, _raw:Tuple, username:str, win:bool, guesses:int, greens:int, yellows:int, uniques:int, date:int) -> BaseStats:
+
+        # create update values object. This will calculate all the updated stats
+        vals = UpdateValues(_raw, win, guesses, greens, yellows, uniques, date)
+
+        # the user's new row, in the order of SELECT_USER
+        _row = (
+            date,
+            vals._games_update,
+            vals._wins_update,
+            vals._guesses_update,
+            vals._greens_update,
+            vals._yellows_update,
+            vals._uniques_update,
+            *vals._distro_update,
+            vals._last_win_update,
+            vals._streak_update,
+            vals._max_update)
+
+        # update data in database for this user, one statement per table
+        _cur.execute(UPDATE_DATA, (*_row[1:7], *vals._distro_step, *_row[13:], date, username))
+        _cur.execute(UPDATE_STATS, (
+            vals._win_rate_update,
+            vals._avg_guesses_update,
+            vals._green_rate_update,
+            vals._yellow_rate_update,
+            username))
+
+        # write through to the cache, and rank once committed
+        self._put_user(username, _row)
+        self._ranked.append((username, _row))
 
         # return the stats object
-        return BaseStats(vals._distro_str_update, vals._games_update, vals._win_rate_update, vals._streak_update, vals._max_update)
+        return BaseStats(vals._distro_update, vals._games_update, vals._win_rate_update, vals._streak_update, vals._max_update)
 
-    def _add_user(self, username:str, win:bool, guesses:int, greens:int, yellows:int, uniques:int, date:int) -> BaseStats:
+    def _add_user(self, _cur, username:str, win:bool, guesses:int, greens:int, yellows:int, uniques:int, date:int) -> BaseStats:
         
-        # initialize the distribution dictionary
-        _distro_dict = {1: 0, 2: 0, 3: 0, 4: 0, 5: 0, 6: 0}
-
         # set guess distribution if the player won
-        if win:
-            _distro_dict[guesses] += 1
-
-        # convert dictionary to string
-        _distro_insert = ' '.join(map(str, _distro_dict.values()))
+        _distro_insert = tuple(int(win and guesses == n) for n in range(1, 7))
 
         # attempts set to 1
         _games_insert = 1
@@ -339,99 +735,400 @@ class BotDatabase:
         # get the yellow rate
         _yellow_rate = yellows / uniques
 
-        with self._database as _cur:
-
-            # execute sql script to add new user to the database
-            _cur.executescript(f'''
-                INSERT INTO User_Data (
-                    username, 
-                    games, 
-                    wins, 
-                    guesses, 
-                    greens, 
-                    yellows,
-                    uniques, 
-                    guess_distro,
-                    last_win,
-                    last_submit,
-                    curr_streak, 
-                    max_streak) 
-                    Values (
-                        '{username}', 
-                        {_games_insert}, 
-                        {_wins_insert}, 
-                        {guesses}, 
-                        {greens}, 
-                        {yellows}, 
-                        {uniques},
-                        '{_distro_insert}',
-                        {_date_insert},
-                        {date},
-                        {_streak_insert}, 
-                        {_streak_insert});
-                INSERT INTO User_Stats (
-                    username, 
-                    win_rate, 
-                    avg_guesses, 
-                    green_rate, 
-                    yellow_rate)
-                    Values (
-                        '{username}', 
-                        {_win_rate}, 
-                        {_avg_guesses}, 
-                        {_green_rate}, 
-                        {_yellow_rate});''')
+        # add new user to the database
+        _cur.execute(INSERT_DATA, (
+            username,
+            _games_insert,
+            _wins_insert,
+            guesses,
+            greens,
+            yellows,
+            uniques,
+            *_distro_insert,
+            _date_insert,
+            date,
+            _streak_insert,
+            _streak_insert))
+        _cur.execute(INSERT_STATS, (
+            username,
+            _win_rate,
+            _avg_guesses,
+            _green_rate,
+            _yellow_rate))
+
+        # write through to the cache, in the order of SELECT_USER, and rank once committed
+        _row = (date, _games_insert, _wins_insert, guesses, greens, yellows, uniques,
+                *_distro_insert, _date_insert, _streak_insert, _streak_insert)
+        self._put_user(username, _row)
+        self._ranked.append((username, _row))
 
         # return the base_stats
         return BaseStats(_distro_insert, _games_insert, _win_rate, _streak_insert, _streak_insert)
 
-    def submit_data(self, username:str, dtime:datetime, win:bool, guesses:int, greens:int, yellows:int, uniques:int) -> BaseStats:
-        '''Given the username and info on game submission, user stats are updated in the database and their BaseStats are returned. 
-        A user is added to the database if they are a new user. 
-        Method will raise DoubleSubmit exception if method is called on the same user twice or more on one day'''
+    def _add_game(self, _cur, username:str, dtime:datetime, guess_table:np.ndarray | None, score_table:np.ndarray) -> None:
+
+        # pack the rows into letter and score codes
+        _guesses = encode(guess_table).tobytes() if guess_table is not None else None
+        _scores = np.asarray(score_table, dtype=np.uint8).tobytes()
+
+        # day numbers of the submission and of its puzzle
+        _day = dtime.toordinal() - EPOCH.toordinal()
+        _wordle = dtime.toordinal() - FIRST_WORDLE.toordinal()
+
+        _cur.execute(INSERT_GAME, (username, _day, _wordle, _guesses, _scores))
+
+    def _add_rollups(self, _cur, username:str, dtime:datetime, win:bool, guesses:int, greens:int, yellows:int, uniques:int) -> None:
+
+        # the game's totals, added to its day and to every period
+        _totals = (int(win), guesses, greens, yellows, uniques)
+        _day = dtime.toordinal() - EPOCH.toordinal()
+        _cur.execute(ADD_DAILY, (username, _day, *_totals))
+
+        _periods = []
+        for period in PERIODS:
+            _start = period_start(period, dtime).toordinal() - EPOCH.toordinal()
+            _periods += [username, period, _start, *_totals]
+        _cur.execute(ADD_PERIODS, _periods)
+
+    def _submit(self, _cur, username:str, dtime:datetime, win:bool, guesses:int, greens:int, yellows:int, uniques:int,
+                guess_table:np.ndarray = None, score_table:np.ndarray = None) -> BaseStats:
 
         # convert datetime object to int of form YYYYMMDD
         _date = int(dtime.strftime('%Y%m%d'))
 
-        with self._database as _cur:
-            # get the raw result from the database query. _raw will be a tuple containing the last solve for the specified username if they are in 
-            # the database. _raw will be None if the username does not exist in the database
-            _raw = _cur.execute(f"SELECT last_submit from User_Data WHERE username = '{username}';").fetchone()
+        # get the user's record, from memory if possible. _record will be None if the username does not exist in the database
+        _record = self._get_user(_cur, username)
 
         # user does exist in database
-        if _raw:
-            # extract the last submission date for this user
-            _last_submit, = _raw
-
+        if _record:
             # check if this user has already submitted this day
-            if _last_submit == _date and not DBLSUB_DISABLED:
+            if _record.last_submit == _date and not DBLSUB_DISABLED:
 
                 # raise DoubleSubmit exception
                 raise DoubleSubmit(username)
-            
+
             # if we get to this point the user is submitting for the first time on day: _date
             # update stats
-            return self._update_user(username, win, guesses, greens, yellows, uniques, _date), 'submit'
+            result = self._update_user(_cur, _record.fields(), username, win, guesses, greens, yellows, uniques, _date), 'submit'
 
         # user does not exist in database
         else:
             # add the user to the database
-            return self._add_user(username, win, guesses, greens, yellows, uniques, _date), 'new'
+            result = self._add_user(_cur, username, win, guesses, greens, yellows, uniques, _date), 'new'
+
+        # count the game in its day and periods
+        self._add_rollups(_cur, username, dtime, win, guesses, greens, yellows, uniques)
+
+        # keep the game itself
+        if score_table is not None:
+            self._add_game(_cur, username, dtime, guess_table, score_table)
+
+        return result
 
-    def get_full_stats(self, username:str) -> FullStats:
+    def submit_data(self, username:str, dtime:datetime, win:bool, guesses:int, greens:int, yellows:int, uniques:int,
+                    guess_table:np.ndarray = None, score_table:np.ndarray = None) -> BaseStats:
+        '''Given the username and info on game submission, user stats are updated in the database and their BaseStats are returned. 
+        A user is added to the database if they are a new user. The game is added to their history if its score table is given.
+        Method will raise DoubleSubmit exception if method is called on the same user twice or more on one day'''
+
+        # the read, the check and the writes all happen in one transaction, committed (or rolled back) when the
+        # block exits. sqlite3 would only begin it at the first write, after the read, so it is begun here.
+        try:
+            with self._database as _cur:
+                _cur.execute('BEGIN IMMEDIATE;')
+                result = self._submit(_cur, username, dtime, win, guesses, greens, yellows, uniques, guess_table, score_table)
+
+        # the user's row may have been cached by a write that was rolled back
+        except Exception:
+            self._users.pop(username, None)
+            self._ranked.clear()
+            raise
+
+        self._rank()
+        return result
+
+    def submit_group(self, submissions:list[Tuple]) -> list:
+        '''Submit several games (tuples of submit_data's arguments) in one transaction, so they share a commit.
+        Returns what submit_data would have returned for each, or the exception it would have raised.'''
+
+        results = []
+        try:
+            # one transaction for the whole group, committed (or rolled back) when the block exits.
+            # Without it every outermost SAVEPOINT would start, and its RELEASE commit, a transaction of its own
+            with self._database as _cur:
+                _cur.execute('BEGIN IMMEDIATE;')
+                for submission in submissions:
+                    # a failed submission is undone without touching the rest of the group
+                    _cur.execute('SAVEPOINT submission;')
+                    _mark = len(self._ranked)
+                    try:
+                        results.append(self._submit(_cur, *submission))
+                    except Exception as e:
+                        _cur.execute('ROLLBACK TO submission;')
+                        self._users.pop(submission[0], None)
+                        del self._ranked[_mark:]
+                        results.append(e)
+                    _cur.execute('RELEASE submission;')
+
+        # the group was rolled back, so nothing cached since it began can be trusted
+        except Exception:
+            self._users.clear()
+            self._ranked.clear()
+            raise
+
+        self._rank()
+
+        # the group is committed, every result may be handed out
+        return results
+
+    def merge_games(self, username:str, submissions:list[Tuple]) -> list:
+        '''Add games of one user (tuples of submit_data's arguments) that may be older than their last submission,
+        e.g. imported ones. The user's totals, streaks and periods are rebuilt by replaying every day they played
+        (from Daily) and the new games in date order, in one transaction. A new game on a day already played is a DoubleSubmit.
+        Returns what submit_group would have returned for each. Raises IncompleteHistory if Daily does not hold every game.'''
+
+        results = [None] * len(submissions)
+        try:
+            with self._database as _cur:
+                _cur.execute('BEGIN IMMEDIATE;')
+
+                # every game the user has played has to be in Daily, one per day
+                _record = self._get_user(_cur, username)
+                _history = _cur.execute(SELECT_HISTORY, (username,)).fetchall()
+                if _record and (sum(_row[1] for _row in _history) != _record.games or any(_row[1] > 1 for _row in _history)):
+                    raise IncompleteHistory(username)
+
+                # forget the user, then replay their days and the new games oldest first (a played day before a new game on it)
+                for _delete in DELETE_USER:
+                    _cur.execute(_delete, (username,))
+                self._users.pop(username, None)
+
+                _games = [(_day, -1, (username, EPOCH + timedelta(days=_day), bool(_wins), *_totals)) for _day, _, _wins, *_totals in _history]
+                _games += [(submission[1].toordinal() - EPOCH.toordinal(), i, submission) for i, submission in enumerate(submissions)]
+                _games.sort(key=lambda game: game[:2])
+
+                for _, i, submission in _games:
+                    if i < 0:
+                        self._submit(_cur, *submission)
+                        continue
+
+                    # a failed game is undone without touching the rest
+                    _cur.execute('SAVEPOINT submission;')
+                    _mark = len(self._ranked)
+                    try:
+                        results[i] = self._submit(_cur, *submission)
+                    except Exception as e:
+                        _cur.execute('ROLLBACK TO submission;')
+                        self._users.pop(username, None)
+                        del self._ranked[_mark:]
+                        results[i] = e
+                    _cur.execute('RELEASE submission;')
+
+        # the merge was rolled back, so nothing cached since it began can be trusted
+        except Exception:
+            self._users.clear()
+            self._ranked.clear()
+            raise
+
+        self._rank()
+        return results
+
+    def get_last_submit(self, username:str) -> date | None:
+
+        with self._database as _cur:
+            # the day of the user's last submission, None if they have never submitted
+            _record = self._get_user(_cur, username)
+            return datetime.strptime(str(_record.last_submit), '%Y%m%d').date() if _record else None
+
+    def get_full_stats(self, username:str) -> FullStats | None:
         
         with self._database as _cur:
             # get all data fields for the specified user
-            _raw = _cur.execute(f'''
-                SELECT
-                    games, wins, guesses, greens, yellows, uniques, guess_distro, last_win,
-                    curr_streak, max_streak, win_rate, avg_guesses, green_rate, yellow_rate
-                FROM
-                    User_Data CROSS JOIN User_Stats
-                WHERE
-                    User_Data.username = '{username}';
-                ''').fetchone()
-
-        # return FullStats object
-        return FullStats(_raw)
-        
\ No newline at end of file
+            return _full_stats(_cur, username)
+
+    def get_period_stats(self, username:str, period:str, today:date = None) -> WindowStats:
+
+        with self._database as _cur:
+            # a user's totals in the current week, month or season
+            return _period_stats(_cur, username, period, today)
+
+
+# apply the settings shared by every connection
+def _configure(connection:Connection) -> None:
+    for pragma, value in DB_PRAGMAS.items():
+        connection.execute(f'PRAGMA {pragma} = {value};')
+
+
+# read a user's stats through any connection, None if they have never submitted
+def _full_stats(connection:Connection, username:str) -> FullStats | None:
+
+    # get all data fields for the specified user
+    _raw = connection.execute(SELECT_FULL_STATS, (username,)).fetchone()
+
+    # return FullStats object
+    return FullStats(_raw) if _raw else None
+
+# read a user's totals in the current period through any connection
+def _period_stats(connection:Connection, username:str, period:str, today:date = None) -> WindowStats:
+    today = today or date.today()
+    start = period_start(period, today)
+    _raw = connection.execute(SELECT_PERIOD, (username, period)).fetchone()
+
+    # the stored totals are of an earlier period if the user has not played in this one
+    if not _raw or _raw[0] != start.toordinal() - EPOCH.toordinal():
+        return WindowStats(start, today)
+
+    return WindowStats(start, today, *_raw[1:])
+
+
+################################################################################################################################################
+# AsyncBotDatabase class:
+# used to access the wordle bot database from the event loop without blocking it
+################################################################################################################################################
+class AsyncBotDatabase:
+    '''Non-blocking front for BotDatabase.
+
+    ---
+    Writes are queued to a single writer thread that owns the BotDatabase connection, so they keep
+    their order and never wait on each other's locks in Python. Reads go to a small pool of threads,
+    each with its own read-only connection, so stats can be served while a write commits.
+    Every method is awaited from the event loop.
+
+    Full stats that were read are kept in an LRU cache until the user submits again.
+
+    With a group_window, submissions arriving within that many seconds of each other (or while the
+    previous group is being committed) are written in one transaction, paying for one sync to disk.
+    The database then syncs every commit (synchronous FULL), and submit_data only returns once its
+    group is committed, so stats are never shown for a game that could still be lost.
+    '''
+
+    def __init__(self, readers:int = DB_READERS, group_window:float = DB_GROUP_WINDOW) -> None:
+
+        # the database (and its tables) is created before any reader connects to it
+        self.sync = BotDatabase('FULL' if group_window else DB_SYNCHRONOUS)
+
+        # submissions waiting for the next group commit
+        self._group_window = group_window
+        self._group: list[tuple[Tuple, Future]] = []
+        self._groupTimer: TimerHandle = None
+        self._committing = False
+
+        # one thread for every write, in the order they were submitted
+        self._writer = ThreadPoolExecutor(max_workers=1, thread_name_prefix='db-writer')
+
+        # read-only connections, one per reader thread
+        self._local = local()
+        self._connections = []
+        self._readers = ThreadPoolExecutor(max_workers=readers, thread_name_prefix='db-reader', initializer=self._open_reader)
+
+        # full stats of users who asked for them, least recently used first, and the number of
+        # submissions written so far (a read that overlaps one is not cached, it may be stale)
+        self._stats: OrderedDict[str, FullStats] = OrderedDict()
+        self._writes = 0
+
+        # make sure queued writes finish and connections are closed
+        register(self.close_connection)
+
+    def _open_reader(self) -> None:
+        # runs once on every reader thread
+        connection = connect(f'file:{DB_PATH}?mode=ro', uri=True, check_same_thread=False)
+        _configure(connection)
+        self._connections.append(connection)
+        self._local.connection = connection
+
+    async def submit_data(self, username:str, dtime:datetime, win:bool, guesses:int, greens:int, yellows:int, uniques:int,
+                          guess_table:np.ndarray = None, score_table:np.ndarray = None) -> BaseStats:
+        '''Same as BotDatabase.submit_data, run on the writer thread'''
+
+        submission = (username, dtime, win, guesses, greens, yellows, uniques, guess_table, score_table)
+        try:
+            if not self._group_window:
+                return await get_running_loop().run_in_executor(self._writer, partial(self.sync.submit_data, *submission))
+
+            # join the next group, which is committed once the window closes or the previous group is done
+            loop = get_running_loop()
+            future = loop.create_future()
+            self._group.append((submission, future))
+            if not self._committing and self._groupTimer is None:
+                self._groupTimer = loop.call_later(self._group_window, self._commit_group)
+
+            return await future
+
+        # the user's cached stats are out of date once the submission is in
+        finally:
+            self._stats.pop(username, None)
+            self._writes += 1
+
+    def _commit_group(self) -> None:
+        # send every waiting submission to the writer as one transaction
+        self._groupTimer = None
+        group, self._group = self._group, []
+        if group:
+            self._committing = True
+            get_running_loop().create_task(self._run_group(group))
+
+    async def _run_group(self, group:list[tuple[Tuple, Future]]) -> None:
+        submissions, futures = zip(*group)
+        try:
+            results = await get_running_loop().run_in_executor(self._writer, self.sync.submit_group, submissions)
+        except Exception as e:
+            results = [e] * len(group)
+        finally:
+            self._committing = False
+
+        for future, result in zip(futures, results):
+            if future.cancelled():
+                continue
+            if isinstance(result, Exception):
+                future.set_exception(result)
+            else:
+                future.set_result(result)
+
+        # submissions that arrived during the commit have waited long enough
+        self._commit_group()
+
+    async def get_full_stats(self, username:str) -> FullStats | None:
+        '''Same as BotDatabase.get_full_stats, run on a reader thread unless the stats are cached'''
+
+        stats = self._stats.get(username)
+        if stats is not None:
+            self._stats.move_to_end(username)
+            return stats
+
+        writes = self._writes
+        stats = await get_running_loop().run_in_executor(self._readers, self._read, _full_stats, username)
+
+        # remember them, unless a submission was written while they were read
+        if stats is not None and writes == self._writes:
+            self._stats[username] = stats
+            if len(self._stats) > DB_CACHE_SIZE:
+                self._stats.popitem(last=False)
+
+        return stats
+
+    def get_leaderboard(self, ranking:str, count:int = LEADERBOARD_SIZE) -> list[tuple[str, float]]:
+        '''The (username, value) of the first `count` players of a ranking. Kept in memory, so no thread is needed'''
+
+        return self.sync.leaderboard.top(ranking, count)
+
+    def get_rank(self, ranking:str, username:str) -> int | None:
+        '''A player's place in a ranking (1 is first), None if they are not ranked'''
+
+        return self.sync.leaderboard.rank(ranking, username)
+
+    async def get_period_stats(self, username:str, period:str, today:date = None) -> WindowStats:
+        '''Same as BotDatabase.get_period_stats, run on a reader thread'''
+
+        return await get_running_loop().run_in_executor(self._readers, self._read, _period_stats, username, period, today)
+
+    def _read(self, query, *args):
+        # run a read through this reader thread's connection
+        return query(self._local.connection, *args)
+
+    def close_connection(self) -> None:
+        # let queued writes finish, then close every connection
+        self._writer.shutdown(wait=True)
+        self._readers.shutdown(wait=True)
+        for connection in self._connections:
+            connection.close()
+        self.sync.close_connection()
@@ -0,0 +1,116 @@
+from string import ascii_lowercase
+
+# pip modules
+import numpy as np
+
+# import local modules
+from scoring import encode
+
+# objects needed by the scorer
+__all__ = ['WordDecoder', 'glyph_logp', 'ocr_logp']
+
+# letters Tesseract mixes up on Wordle's bold capitals, including the digits and symbols it reads them as
+CONFUSIONS = {
+    'a': '', 'b': 'per8', 'c': 'goq', 'd': 'oq', 'e': 'f', 'f': 'ep', 'g': 'coq', 'h': 'mnk', 'i': 'ljt', 'j': 'i',
+    'k': 'xh', 'l': 'it', 'm': 'nhw', 'n': 'mh', 'o': 'qdcg', 'p': 'rbf', 'q': 'odg', 'r': 'pbk', 's': '',
+    't': 'il', 'u': 'v', 'v': 'uy', 'w': 'm', 'x': 'k', 'y': 'v', 'z': '',
+    '0': 'oqd', '1': 'il', '|': 'il', '!': 'il', '2': 'z', '5': 's', '$': 's', '6': 'g', '8': 'b', '@': 'a',
+}
+
+# how likely Tesseract is to print a letter as one of its confusions, or as anything else
+CONFUSED_P = 0.1
+OTHER_P = 0.001
+
+# sharpness of the softmax turning glyph template correlations into letter probabilities
+GLYPH_TEMPERATURE = 0.05
+
+# letters within this many (natural log) units of a cell's best letter are alternatives for that cell
+ALT_RANGE = np.log(0.02)
+
+# letters a decoded word may take from outside its cells' alternatives
+MAX_CORRECTIONS = 1
+
+# the best word must beat the runner up by this much (natural log), otherwise the row is too ambiguous to correct
+DECODE_MARGIN = np.log(4)
+
+
+# letter log probabilities from the glyph template similarities
+def glyph_logp(sims: np.ndarray) -> np.ndarray:
+    '''Turn (..., 26) template similarities (see GlyphClassifier.scores) into (..., 26) log probabilities'''
+
+    z = sims / GLYPH_TEMPERATURE
+    z -= z.max(axis=-1, keepdims=True)
+    return z - np.log(np.exp(z).sum(axis=-1, keepdims=True))
+
+
+# letter log probabilities from the lines Tesseract printed
+def ocr_logp(lines: list[str]) -> np.ndarray | None:
+    '''Return a (rows, 5, 26) array with the log probability of every letter in every cell given the
+    OCR output, or None if a line is not 5 characters long (letters were merged or split).'''
+
+    if any(len(line) != 5 for line in lines):
+        return None
+
+    p = np.full((len(lines), 5, 26), OTHER_P)
+
+    for (r, c), char in np.ndenumerate([list(line) for line in lines]):
+        # a character Tesseract cannot be trusted on says nothing about the letter
+        if char not in ascii_lowercase and char not in CONFUSIONS:
+            p[r, c] = 1
+            continue
+
+        for alt in CONFUSIONS.get(char, ''):
+            if alt in ascii_lowercase:
+                p[r, c, ord(alt) - ord('a')] = CONFUSED_P
+        if char in ascii_lowercase:
+            p[r, c, ord(char) - ord('a')] = 1
+
+    return np.log(p / p.sum(axis=-1, keepdims=True))
+
+################################################################################################################################################
+# WordDecoder class:
+# finds the most likely valid word given how likely every letter is in every cell
+################################################################################################################################################
+class WordDecoder:
+    '''Dictionary constrained decoder.
+
+    ---
+    Each cell's alternatives form a 26 letter set, and every valid word is checked against the five sets
+    at once by indexing them with the word list's letter codes (one column per position). Only words that
+    miss at most MAX_CORRECTIONS sets are scored, and the one with the highest total log probability wins.
+    '''
+
+    def __init__(self, words: set[str] | list[str]) -> None:
+        self._words = sorted(words)
+        self._codes = encode(self._words)
+        self._columns = np.ascontiguousarray(self._codes.T)
+
+    def decode_row(self, row: np.ndarray) -> str | None:
+        '''Decode a (5, 26) array of letter log probabilities. Returns None if no word is within
+        MAX_CORRECTIONS of the alternatives, or more than one word fits about as well.'''
+
+        # letter sets of each cell, looked up for every word
+        alternatives = row >= row.max(axis=1, keepdims=True) + ALT_RANGE
+        misses = np.zeros(len(self._words), dtype=np.uint8)
+        for p in range(5):
+            misses += ~alternatives[p].take(self._columns[p])
+        candidates = np.flatnonzero(misses <= MAX_CORRECTIONS)
+
+        if not len(candidates):
+            return None
+
+        # best scoring candidate, as long as it is clearly the best
+        scores = sum(row[p].take(self._columns[p, candidates]) for p in range(5))
+        best = scores.argmax()
+        if len(scores) > 1 and np.partition(scores, -2)[-2] > scores[best] - DECODE_MARGIN:
+            return None
+
+        return self._words[candidates[best]]
+
+    def decode(self, logp: np.ndarray) -> list[str] | None:
+        '''Decode every row of a (rows, 5, 26) array of letter log probabilities.
+        Returns None if any row cannot be decoded.'''
+
+        words = [self.decode_row(row) for row in logp]
+
+        return None if None in words else words
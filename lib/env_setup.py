@@ -37,10 +37,16 @@ ACTIVATE_ENV = 'source ./venv/bin/activate;'
 # command to remove the virtual environment
 REMOVE_ENV = 'rm -rf venv/'
 
+# command to build the feedback matrix (about 20 seconds), so the bot does not build it on its first start.
+# It needs numpy, so it runs in the virtual environment once the pip packages are installed
+BUILD_FEEDBACK = ACTIVATE_ENV + 'python3.10 -c "import sys; sys.path.append(\'./lib\'); from feedback import gen_feedback; gen_feedback()"; deactivate'
+
 # required apt packages
 REQ_APT = [
     'python3.10-venv',
-    'tesseract-ocr' ]
+    'tesseract-ocr',
+    'libtesseract-dev',
+    'libleptonica-dev' ]
 
 # required pip packages
 REQ_PIP = [
@@ -48,7 +54,9 @@ REQ_PIP = [
     'opencv-python',
     'psutil',
     'pytesseract',
+    'tesserocr',
     'requests',
+    'sortedcontainers',
     '--upgrade git+https://github.com/Rapptz/discord.py' ]
 
 
@@ -103,8 +111,14 @@ def install() -> None:
         # install pip packages
         run(pip_cmds, stdout=outlog, stderr=errlog, shell=True, executable=BASH)
 
+        # notify user of step
+        print(green('pip packages installed'))
+
+        # build the feedback matrix from the pickle files
+        run(BUILD_FEEDBACK, stdout=outlog, stderr=errlog, shell=True, executable=BASH)
+
     # notify user that install is complete
-    print(green('pip packages installed'))
+    print(green('feedback matrix built'))
     print(green('bot environment setup complete'))
 
 def remove(all=False) -> None:
@@ -0,0 +1,152 @@
+from os import replace
+from os.path import exists
+from dataclasses import dataclass
+from hashlib import blake2b
+
+# pip modules
+import numpy as np
+
+# import local modules
+from wotd import get_valid_words, get_word_order
+from scoring import encode, score_codes
+
+# objects needed by the scorer and the bot
+__all__ = ['GameAnalysis', 'FeedbackMatrix', 'gen_feedback', 'pattern_codes']
+
+# path to the guess x answer matrix of feedback patterns
+FEEDBACK_PATH = './lib/wordle_pickles/feedback.npy'
+
+# path to the digest of the word lists the matrix was built from
+FEEDBACK_KEY_PATH = './lib/wordle_pickles/feedback.key'
+
+# number of guesses scored against every answer at once while building the matrix
+BUILD_CHUNK = 256
+
+# place value of each letter's score in a pattern (base 3, first letter most significant)
+_POWERS = 3 ** np.arange(4, -1, -1, dtype=np.uint8)
+
+
+# turn rows of score codes into feedback patterns (0 = all grey ... 242 = all green)
+def pattern_codes(scores: np.ndarray) -> np.ndarray:
+    return (scores.astype(np.uint8) * _POWERS).sum(axis=-1, dtype=np.uint8)
+
+
+# the order of the rows (guesses) and columns (answers) of the matrix
+def _guess_list() -> list[str]:
+    return sorted(get_valid_words())
+
+def _answer_list() -> list[str]:
+    return list(dict.fromkeys(get_word_order()))
+
+
+# digest of the rows and columns, so a matrix built from other word lists is never indexed with these
+def _lists_key(guesses: list[str], answers: list[str]) -> str:
+    return blake2b('\n'.join(guesses + [''] + answers).encode(), digest_size=16).hexdigest()
+
+
+# build the feedback matrix if it does not exist yet, or was built from different word lists
+def gen_feedback() -> bool:
+    guess_list, answer_list = _guess_list(), _answer_list()
+    key = _lists_key(guess_list, answer_list)
+
+    if exists(FEEDBACK_PATH) and exists(FEEDBACK_KEY_PATH):
+        with open(FEEDBACK_KEY_PATH) as f:
+            if f.read() == key:
+                # matrix was not generated
+                return False
+
+    guesses = encode(guess_list)
+    answers = encode(answer_list)
+
+    # write straight into a memory mapped file so the whole matrix is never held in memory.
+    # Build under a temporary name so a half written matrix is never loaded.
+    tmp_path = FEEDBACK_PATH + '.tmp'
+    matrix = np.lib.format.open_memmap(tmp_path, mode='w+', dtype=np.uint8, shape=(len(guesses), len(answers)))
+
+    for start in range(0, len(guesses), BUILD_CHUNK):
+        chunk = guesses[start:start+BUILD_CHUNK, None, None, :]
+        matrix[start:start+BUILD_CHUNK] = pattern_codes(score_codes(chunk, answers[None])[..., 0, :])
+
+    matrix.flush()
+    del matrix
+    replace(tmp_path, FEEDBACK_PATH)
+
+    # the key is written last, so a build that is cut short is started over
+    with open(FEEDBACK_KEY_PATH + '.tmp', 'w') as f:
+        f.write(key)
+    replace(FEEDBACK_KEY_PATH + '.tmp', FEEDBACK_KEY_PATH)
+
+    # matrix was generated
+    return True
+
+################################################################################################################################################
+# GameAnalysis class:
+# information gained by each guess of a game
+################################################################################################################################################
+@dataclass
+class GameAnalysis:
+    """Per guess analysis DTO
+
+    ---
+    - remaining: possible answers before each guess, followed by the number left after the last guess
+    - expected: bits each guess was expected to gain given the answers still possible (skill)
+    - actual: bits each guess really gained"""
+
+    remaining: list[int]
+    expected: list[float]
+    actual: list[float]
+
+    @property
+    def skill(self) -> float:
+        return sum(self.expected)
+
+    @property
+    def luck(self) -> float:
+        return sum(self.actual) - self.skill
+
+################################################################################################################################################
+# FeedbackMatrix class:
+# memory mapped matrix holding the feedback pattern of every guess/answer pair
+################################################################################################################################################
+class FeedbackMatrix:
+    '''Lookup table of Wordle feedback.
+
+    ---
+    Row g, column a holds the pattern (see pattern_codes) shown when guessing word g with answer a.
+    The file is memory mapped read-only, so every process scoring games shares one copy in the page cache.
+    '''
+
+    def __init__(self) -> None:
+        self._matrix = np.load(FEEDBACK_PATH, mmap_mode='r')
+        self._rows = {w: i for i, w in enumerate(_guess_list())}
+        self._answers = len(_answer_list())
+
+    def analyze(self, guesses: list[str], patterns: np.ndarray) -> GameAnalysis | None:
+        '''Replay a game, narrowing down the possible answers after every guess.
+        Returns None if a guess is not in the matrix.'''
+
+        candidates = np.arange(self._answers)
+        analysis = GameAnalysis([], [], [])
+
+        for guess, pattern in zip(guesses, patterns):
+            if guess not in self._rows:
+                return None
+
+            # how the guess splits the answers that are still possible
+            row = self._matrix[self._rows[guess], candidates]
+            counts = np.bincount(row, minlength=243)
+            p = counts[counts > 0] / len(candidates)
+
+            analysis.remaining.append(len(candidates))
+            analysis.expected.append(float((p * np.log2(1 / p)).sum()))
+
+            # the answer is not in the word order (e.g. a newer puzzle), nothing more can be said
+            if not counts[pattern]:
+                return None
+
+            analysis.actual.append(float(np.log2(len(candidates) / counts[pattern])))
+            candidates = candidates[row == pattern]
+
+        analysis.remaining.append(len(candidates))
+
+        return analysis
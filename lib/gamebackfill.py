@@ -0,0 +1,304 @@
+from argparse import ArgumentParser
+from asyncio import run, gather, to_thread, create_task
+from concurrent.futures import ThreadPoolExecutor
+from csv import DictReader
+from datetime import datetime, date
+from io import TextIOWrapper
+from json import load, dump
+from os import replace, walk
+from os.path import abspath, exists, isdir, join, relpath, normpath
+from sys import stderr
+from tarfile import open as open_tar, is_tarfile
+from time import perf_counter
+from zipfile import ZipFile, is_zipfile
+
+# import local modules
+from scorer import GameScorer, GameStats
+from scorepool import ScorePool, POOL_WORKERS, POOL_TIMEOUT
+from botdatabase import BotDatabase, DoubleSubmit, IncompleteHistory
+from wotd import get_wotd
+
+# objects needed by backfill.py
+__all__ = ['run_backfill']
+
+# name of the manifest looked for inside the source when none is given
+MANIFEST_NAME = 'manifest.csv'
+
+# where progress is saved between runs
+CHECKPOINT_PATH = './lib/bot_database/backfill_checkpoint.json'
+
+# games scored and then written to the database together. A chunk is scored while the one before it is written.
+BACKFILL_CHUNK = 256
+
+# threads resolving words of the day before the workers are started
+WOTD_THREADS = 8
+
+
+################################################################################################################################################
+# _Source class:
+# screenshots in a directory, a zip archive or a tar archive, read by their path within it
+################################################################################################################################################
+class _Source:
+    def __init__(self, path: str) -> None:
+        self._dir = self._zip = self._tar = None
+
+        if isdir(path):
+            self._dir = path
+        elif is_zipfile(path):
+            self._zip = ZipFile(path)
+        elif is_tarfile(path):
+            self._tar = open_tar(path)
+            # archives made with `tar -C dir .` name their members ./file
+            self._members = {normpath(member.name): member for member in self._tar.getmembers() if member.isfile()}
+        else:
+            raise ValueError(f'{path} is not a directory, a zip or a tar archive')
+
+    def names(self) -> set[str]:
+        if self._zip:
+            return set(self._zip.namelist())
+        if self._tar:
+            return set(self._members)
+
+        return {relpath(join(root, name), self._dir) for root, _, names in walk(self._dir) for name in names}
+
+    def open_text(self, name: str):
+        if self._zip:
+            return TextIOWrapper(self._zip.open(name), newline='')
+        if self._tar:
+            return TextIOWrapper(self._tar.extractfile(self._members[normpath(name)]), newline='')
+
+        return open(join(self._dir, name), newline='')
+
+    def read(self, name: str) -> bytes:
+        if self._zip:
+            return self._zip.read(name)
+        if self._tar:
+            return self._tar.extractfile(self._members[normpath(name)]).read()
+
+        with open(join(self._dir, name), 'rb') as f:
+            return f.read()
+
+    def close(self) -> None:
+        if self._zip:
+            self._zip.close()
+        if self._tar:
+            self._tar.close()
+
+
+# (file, user, date) of every game in the manifest, oldest first
+def _read_manifest(source: _Source, manifest: str | None) -> list[tuple[str, str, datetime]]:
+    '''The manifest is a CSV with file, user and date (ISO format) columns. It is read from `manifest`
+    if given, otherwise from MANIFEST_NAME inside the source.'''
+
+    f = open(manifest, newline='') if manifest else source.open_text(MANIFEST_NAME)
+    with f:
+        entries = [(row['file'], row['user'], datetime.fromisoformat(row['date'])) for row in DictReader(f)]
+
+    # games are replayed in the order they were played, so streaks come out right
+    entries.sort(key=lambda e: (e[2].date(), e[1], e[0]))
+
+    return entries
+
+
+# progress saved by an earlier run on the same source
+def _load_checkpoint(path: str, source: str) -> dict:
+    if exists(path):
+        with open(path) as f:
+            checkpoint = load(f)
+        if checkpoint.get('source') == source:
+            return checkpoint
+
+    return {'source': source, 'done': [], 'failed': {}}
+
+
+# save progress, replacing the old checkpoint in one step so a crash never leaves half a file
+def _store_checkpoint(path: str, checkpoint: dict) -> None:
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'w') as f:
+        dump(checkpoint, f)
+    replace(tmp_path, path)
+
+
+# fetch the word of every day being backfilled, so the workers find them in the cache
+def _resolve_words(days: set[date]) -> int:
+    '''Return the number of days whose word could not be fetched (the scorer falls back on the tile colors)'''
+
+    def resolve(day: date) -> bool:
+        return get_wotd(datetime(day.year, day.month, day.day), wrdl_num=True)[1] is not None
+
+    with ThreadPoolExecutor(WOTD_THREADS) as executor:
+        return sum(not fetched for fetched in executor.map(resolve, sorted(days)))
+
+
+# score a chunk of games through the pool, returning a GameStats or the exception for each
+async def _score_chunk(pool: ScorePool, source: _Source, chunk: list[tuple[str, str, datetime]]) -> list[GameStats | Exception]:
+
+    async def score(name: str, dtime: datetime) -> GameStats | Exception:
+        try:
+            return await pool.score(source.read(name), dtime)
+        except Exception as e:
+            return e
+
+    return await gather(*(score(name, dtime) for name, _, dtime in chunk))
+
+
+# write the games of a chunk to the database, returning the error (if any) of each
+def _replay(db: BotDatabase, chunk: list[tuple[str, str, datetime]], results: list[GameStats | Exception],
+            last_submit: dict[str, date | None]) -> list[str | None]:
+    '''Games older than their user's last submission before the backfill are merged into the user's history,
+    one transaction per user. The rest are submitted in one transaction, after the merges since they are newer.'''
+
+    errors = [type(result).__name__ if isinstance(result, Exception) else None for result in results]
+
+    # the position of every game in the chunk, by how it is written
+    merges: dict[str, list[int]] = {}
+    group: list[int] = []
+    for i, ((_, user, dtime), error) in enumerate(zip(chunk, errors)):
+        if error is None:
+            if last_submit[user] and dtime.date() <= last_submit[user]:
+                merges.setdefault(user, []).append(i)
+            else:
+                group.append(i)
+
+    def submission(i: int) -> tuple:
+        (_, user, dtime), game = chunk[i], results[i]
+        return (user, dtime, game.won, game.numGuesses, game.uniqueCorrect, game.uniqueMisplaced, game.uniqueAll, game.guessTable, game.scoreTable)
+
+    # a user whose history cannot be rebuilt fails all of their merged games
+    written = []
+    for user, positions in merges.items():
+        try:
+            written += zip(positions, db.merge_games(user, [submission(i) for i in positions]))
+        except IncompleteHistory as e:
+            written += ((i, e) for i in positions)
+
+    written += zip(group, db.submit_group([submission(i) for i in group]))
+
+    for i, result in written:
+        if isinstance(result, Exception):
+            errors[i] = type(result).__name__
+
+    return errors
+
+
+# one line of progress
+def _report(done: int, total: int, imported: int, failed: int, skipped: int, seconds: float, scored: int) -> None:
+    rate = scored / seconds if seconds else 0
+    eta = (total - done) / rate if rate else float('inf')
+    print(f'{done}/{total} games  {imported} imported  {failed} failed  {skipped} skipped  '
+          f'{rate:.1f} images/s  eta {eta:.0f}s', file=stderr, flush=True)
+
+
+async def _backfill(args, source: _Source, entries: list[tuple[str, str, datetime]], checkpoint: dict, db: BotDatabase) -> dict:
+    # games that failed before are tried again if asked to
+    if args.retry_failed:
+        checkpoint['failed'] = {}
+
+    done = set(checkpoint['done'])
+    total = len(entries)
+    imported, failed, skipped = 0, len(checkpoint['failed']), 0
+
+    # games older than what is already in the database are merged into their user's history
+    last_submit = {user: db.get_last_submit(user) for user in {user for _, user, _ in entries}}
+    pending = [entry for entry in entries if entry[0] not in done and entry[0] not in checkpoint['failed']]
+    remaining = len(pending)
+
+    chunks = [pending[i : i + args.chunk] for i in range(0, len(pending), args.chunk)]
+
+    # the words are fetched before the workers fork, so every worker starts with them cached
+    print(f'{len(pending)} games to backfill over {len({e[2].date() for e in pending})} days', file=stderr, flush=True)
+    unresolved = await to_thread(_resolve_words, {e[2].date() for e in pending})
+    if unresolved:
+        print(f'{unresolved} words of the day could not be fetched, those games are scored from their tile colors', file=stderr, flush=True)
+
+    # a chunk has to clear the queue within the timeout, so it is scaled by how many games wait per worker
+    pool = ScorePool(GameScorer(), workers=args.workers, max_pending=args.chunk,
+                     timeout=POOL_TIMEOUT * (args.chunk // args.workers + 1))
+    start, scored = perf_counter(), 0
+    try:
+        # score the next chunk while the last one is written
+        scoring = create_task(_score_chunk(pool, source, chunks[0])) if chunks else None
+        for i, chunk in enumerate(chunks):
+            results = await scoring
+            scored += len(chunk)
+            scoring = create_task(_score_chunk(pool, source, chunks[i + 1])) if i + 1 < len(chunks) else None
+
+            errors = await to_thread(_replay, db, chunk, results, last_submit)
+
+            for (name, _, _), error in zip(chunk, errors):
+                if error is None:
+                    imported += 1
+                    checkpoint['done'].append(name)
+                elif error == DoubleSubmit.__name__:
+                    skipped += 1
+                    checkpoint['done'].append(name)
+                else:
+                    failed += 1
+                    checkpoint['failed'][name] = error
+            remaining -= len(chunk)
+
+            # the chunk is committed, so it is never scored again. Merges commit apart from the rest of the
+            # chunk, so a run interrupted in between finds those games again on resume and counts them as skipped.
+            _store_checkpoint(args.checkpoint, checkpoint)
+            _report(total - remaining, total, imported, failed, skipped, perf_counter() - start, scored)
+    finally:
+        pool.shutdown()
+
+    seconds = perf_counter() - start
+    errors = {}
+    for error in checkpoint['failed'].values():
+        errors[error] = errors.get(error, 0) + 1
+
+    # users whose older games could not be merged, and were not imported
+    incomplete = sorted({user for name, user, _ in entries if checkpoint['failed'].get(name) == IncompleteHistory.__name__})
+
+    return {
+        'games': total,
+        'imported': imported,
+        'failed': failed,
+        'skipped': skipped,
+        'errors': errors,
+        'incomplete_users': incomplete,
+        'seconds': seconds,
+        'images_per_second': scored / seconds if seconds else 0,
+    }
+
+
+# score a channel's worth of old screenshots and add them to the database
+def run_backfill(argv: list[str] = None) -> dict:
+    parser = ArgumentParser(description='Import old Wordle screenshots into the database, oldest first. Stop the bot while this runs.')
+    parser.add_argument('source', help='directory, zip or tar archive of screenshots')
+    parser.add_argument('-m', '--manifest', default=None, help=f'CSV with file, user and date columns (defaults to {MANIFEST_NAME} in the source)')
+    parser.add_argument('-w', '--workers', type=int, default=POOL_WORKERS, help='number of processes scoring screenshots')
+    parser.add_argument('-c', '--checkpoint', default=CHECKPOINT_PATH, help='where progress is saved, so an interrupted backfill can resume')
+    parser.add_argument('--chunk', type=int, default=BACKFILL_CHUNK, help='games scored and written to the database together')
+    parser.add_argument('--retry-failed', action='store_true', help='score games that failed in an earlier run again')
+    args = parser.parse_args(argv)
+
+    source = _Source(args.source)
+    try:
+        entries = _read_manifest(source, args.manifest)
+
+        # every file in the manifest has to be in the source
+        missing = {normpath(name) for name, _, _ in entries} - source.names()
+        if missing:
+            raise ValueError(f'{len(missing)} files in the manifest are not in {args.source}, e.g. {min(missing)}')
+
+        checkpoint = _load_checkpoint(args.checkpoint, abspath(args.source))
+
+        db = BotDatabase()
+        try:
+            summary = run(_backfill(args, source, entries, checkpoint, db))
+        finally:
+            db.close_connection()
+    finally:
+        source.close()
+
+    print(f'imported {summary["imported"]} of {summary["games"]} games in {summary["seconds"]:.1f}s '
+          f'({summary["images_per_second"]:.1f} images/s), {summary["failed"]} failed, {summary["skipped"]} skipped', file=stderr)
+
+    if summary['incomplete_users']:
+        print(f'{len(summary["incomplete_users"])} users played before daily totals were kept, so their games older than their '
+              f'last submission were not imported: {", ".join(summary["incomplete_users"])}', file=stderr)
+
+    return summary
@@ -0,0 +1,158 @@
+from os.path import exists
+from string import ascii_lowercase
+from pickle import load, dump
+
+# pip modules
+import numpy as np
+import cv2
+
+# import local modules
+from gridlocate import find_cells
+
+# objects needed by the scorer
+__all__ = ['GlyphClassifier', 'cell_grid', 'gen_templates']
+
+# side length (pixels) that every glyph is normalized to before matching
+GLYPH_SIZE = 24
+
+# fraction of a cell's width trimmed from each edge so tile borders are never mistaken for glyph pixels
+CELL_INSET = 0.12
+
+# a cell holds a letter if the glyph covers between these fractions of its (inset) area
+MIN_INK = 0.03
+MAX_INK = 0.60
+
+# lowest template similarity accepted for a letter. Below this the caller should fall back to OCR.
+MIN_CONFIDENCE = 0.75
+
+# path to the letter templates
+TEMPLATES_PATH = './lib/wordle_pickles/glyph_templates.pkl'
+
+# screenshot with every letter on it, and the letters in the order they appear (row-major)
+TEMPLATE_SOURCE = './lib/images/test-games/wordle-game-dark-allchars.png'
+TEMPLATE_LABELS = 'abcdefghijklmnopqrstuvwxyzqorp'
+
+
+# sort the 30 cell boxes into a 6x5 grid
+def cell_grid(cells: np.ndarray) -> np.ndarray:
+    '''Return an int array of shape (6, 5, 4) holding (x, y, w, h) of every cell in guess order'''
+
+    # order top to bottom, then each row left to right
+    boxes = cells[np.argsort(cells[:, 1], kind='stable')].reshape(6, 5, 4)
+    order = np.argsort(boxes[:, :, 0], axis=1, kind='stable')
+
+    return np.take_along_axis(boxes, order[..., None], axis=1)
+
+
+# cut the glyphs out of a character mask (letters are 0, tiles are 255)
+def _crop_cells(charmask: np.ndarray, grid: np.ndarray) -> tuple[list[np.ndarray], np.ndarray]:
+    '''Return the glyph of every cell (letter pixels set) and a (6, 5) bool array of which cells hold a letter'''
+
+    glyphs = []
+    filled = np.zeros(grid.shape[:2], dtype=bool)
+
+    for r, c in np.ndindex(*grid.shape[:2]):
+        x, y, w, h = grid[r, c]
+        dx, dy = int(w * CELL_INSET), int(h * CELL_INSET)
+        glyph = charmask[y+dy : y+h-dy, x+dx : x+w-dx] == 0
+
+        # empty dark cells have no ink and empty light cells are nothing but ink
+        filled[r, c] = MIN_INK < glyph.mean() < MAX_INK
+        glyphs.append(glyph)
+
+    return glyphs, filled
+
+
+# scale each glyph to a fixed size and flatten into unit vectors
+def _normalize(glyphs: list[np.ndarray]) -> np.ndarray:
+    '''Return a float32 array of shape (n, GLYPH_SIZE**2) with zero-mean, unit-length rows'''
+
+    vecs = np.zeros((len(glyphs), GLYPH_SIZE * GLYPH_SIZE), dtype=np.float32)
+
+    for i, glyph in enumerate(glyphs):
+        # crop to the ink, then pad to a square so the aspect ratio of the letter is kept
+        ys, xs = np.nonzero(glyph)
+        if not len(ys):
+            continue
+        glyph = glyph[ys.min():ys.max()+1, xs.min():xs.max()+1].astype(np.uint8) * 255
+        h, w = glyph.shape
+        side = max(h, w)
+        glyph = cv2.copyMakeBorder(glyph, (side-h)//2, (side-h+1)//2, (side-w)//2, (side-w+1)//2, cv2.BORDER_CONSTANT, value=0)
+
+        vecs[i] = cv2.resize(glyph, (GLYPH_SIZE, GLYPH_SIZE), interpolation=cv2.INTER_AREA).ravel()
+
+    # correlation becomes a plain dot product
+    vecs -= vecs.mean(axis=1, keepdims=True)
+    vecs /= np.linalg.norm(vecs, axis=1, keepdims=True) + 1e-6
+
+    return vecs
+
+
+# build the letter templates from the labelled screenshot if they do not exist yet
+def gen_templates() -> bool:
+    if exists(TEMPLATES_PATH):
+        # templates were not generated
+        return False
+
+    # find the cells the same way the scorer does (the source is a dark theme screenshot)
+    gray = cv2.imread(TEMPLATE_SOURCE, cv2.IMREAD_GRAYSCALE)
+    _, cellmask = cv2.threshold(gray, 0x26, 255, cv2.THRESH_BINARY)
+    cells = find_cells(cellmask)
+    _, charmask = cv2.threshold(gray, 0xeb, 255, cv2.THRESH_BINARY_INV)
+
+    glyphs, _ = _crop_cells(charmask, cell_grid(cells))
+    vecs = _normalize(glyphs)
+
+    # average the samples of each letter (some letters appear twice)
+    labels = np.frombuffer(TEMPLATE_LABELS.encode(), dtype=np.uint8) - ord('a')
+    templates = np.stack([vecs[labels == i].mean(axis=0) for i in range(26)])
+    templates /= np.linalg.norm(templates, axis=1, keepdims=True)
+
+    with open(TEMPLATES_PATH, 'wb') as f:
+        dump(templates, f)
+
+    # templates were generated
+    return True
+
+################################################################################################################################################
+# GlyphClassifier class:
+# reads the letters of a Wordle board by matching every cell against one template per letter
+################################################################################################################################################
+class GlyphClassifier:
+    '''Template matching letter classifier.
+
+    ---
+    All cells are normalized to GLYPH_SIZE x GLYPH_SIZE unit vectors and compared against the 26 letter
+    templates with a single matrix product. The glyph is taken from the character mask, where letters are
+    white on a colored tile in both themes, so one set of templates covers light and dark screenshots.
+    '''
+
+    def __init__(self) -> None:
+        gen_templates()
+
+        with open(TEMPLATES_PATH, 'rb') as f:
+            self._templates = load(f)
+
+    def scores(self, glyphs: list[np.ndarray]) -> np.ndarray:
+        '''Return a (n, 26) array with the similarity of every glyph to every letter'''
+        return _normalize(glyphs) @ self._templates.T
+
+    def classify(self, charmask: np.ndarray, grid: np.ndarray) -> tuple[list[str], float, np.ndarray] | None:
+        '''Read the guesses off of a board.
+
+        Returns the guesses, the lowest letter confidence and the (rows, 5, 26) similarities of every
+        cell to every letter, or None if the filled cells do not form whole rows at the top of the board.'''
+
+        glyphs, filled = _crop_cells(charmask, grid)
+
+        # guesses fill whole rows from the top and the rest of the board is empty
+        rows = int(filled.all(axis=1).sum())
+        if not rows or filled.sum() != rows * 5 or not filled[:rows].all():
+            return None
+
+        # match every letter at once
+        sims = self.scores(glyphs[:rows * 5])
+        best = sims.argmax(axis=1)
+        letters = np.array(list(ascii_lowercase))[best].reshape(rows, 5)
+
+        return [''.join(row) for row in letters], float(sims.max(axis=1).min()), sims.reshape(rows, 5, 26)
@@ -0,0 +1,105 @@
+from struct import unpack_from
+
+# pip modules
+import numpy as np
+import cv2
+
+# objects needed by the scorer and the glyph templates
+__all__ = ['decode', 'find_cells', 'crop_to_grid']
+
+# screenshots wider than this are decoded at 1/2, 1/4 or 1/8 scale, never narrower than this
+REDUCED_WIDTH = 540
+
+# imdecode flag for each reduction
+_REDUCED_FLAGS = {
+    1: cv2.IMREAD_COLOR,
+    2: cv2.IMREAD_REDUCED_COLOR_2,
+    4: cv2.IMREAD_REDUCED_COLOR_4,
+    8: cv2.IMREAD_REDUCED_COLOR_8,
+}
+
+# a cell is square if its sides differ by at most this fraction of their sum (plus a pixel of rounding)
+SQUARE_TOLERANCE = 0.015
+
+# cells must be within this fraction of the median cell size
+SIZE_TOLERANCE = 0.10
+
+# pixels of background kept around the grid when cropping
+CROP_MARGIN = 4
+
+
+# read the width and height out of a PNG or JPEG header without decoding the image
+def _image_size(image: bytes) -> tuple[int, int] | None:
+    # PNG: the IHDR chunk is always first
+    if image[:8] == b'\x89PNG\r\n\x1a\n' and len(image) >= 24:
+        w, h = unpack_from('>II', image, 16)
+        return w, h
+
+    # JPEG: walk the segments until a start of frame marker
+    if image[:2] == b'\xff\xd8':
+        i = 2
+        while i + 9 <= len(image) and image[i] == 0xff:
+            marker = image[i+1]
+            length, = unpack_from('>H', image, i+2)
+            if 0xc0 <= marker <= 0xcf and marker not in (0xc4, 0xc8, 0xcc):
+                h, w = unpack_from('>HH', image, i+5)
+                return w, h
+            i += 2 + length
+
+    return None
+
+
+# decode a screenshot, shrinking large ones while they are decoded
+def decode(image: bytes) -> np.ndarray | None:
+    '''Return the BGR screenshot, decoded at the largest reduction that keeps it at least REDUCED_WIDTH wide.
+    Returns None if the bytes are not an image.'''
+
+    size = _image_size(image)
+    scale = 1
+    while size and scale < 8 and size[0] // (scale * 2) >= REDUCED_WIDTH:
+        scale *= 2
+
+    return cv2.imdecode(np.frombuffer(image, np.uint8), _REDUCED_FLAGS[scale])
+
+
+# find the 30 cells of the board in a mask of the tiles
+def find_cells(cellmask: np.ndarray) -> np.ndarray | None:
+    '''Return a (30, 4) int array with the (x, y, w, h) box of every cell, or None if there is no board.
+
+    ---
+    The boxes of every blob in the mask come out of one connected components pass, so all of the
+    filtering is done on arrays instead of contour by contour.'''
+
+    _, _, stats, _ = cv2.connectedComponentsWithStats(cellmask, connectivity=8)
+    boxes = stats[1:, :4]
+    w, h = boxes[:, 2], boxes[:, 3]
+
+    # cells are squares, and not so small that they could be specks of text
+    square = np.abs(w - h) <= (w + h) * SQUARE_TOLERANCE + 1
+    square &= w >= cellmask.shape[1] // 40
+    boxes = boxes[square]
+    if len(boxes) < 30:
+        return None
+
+    # the board is the largest group of equally sized squares, e.g. icons in the header are smaller
+    sizes = boxes[:, 2]
+    near = np.abs(sizes[:, None] - sizes[None, :]) <= sizes[None, :] * SIZE_TOLERANCE
+    size = sizes[near.sum(axis=0).argmax()]
+    boxes = boxes[np.abs(sizes - size) <= size * SIZE_TOLERANCE]
+
+    return boxes if len(boxes) == 30 else None
+
+
+# crop images down to the board
+def crop_to_grid(grid: np.ndarray, *images: np.ndarray) -> tuple[np.ndarray, ...]:
+    '''Return the grid moved into the cropped frame, followed by each image cropped to the board plus CROP_MARGIN'''
+
+    height, width = images[0].shape[:2]
+    x0 = max(int(grid[..., 0].min()) - CROP_MARGIN, 0)
+    y0 = max(int(grid[..., 1].min()) - CROP_MARGIN, 0)
+    x1 = min(int((grid[..., 0] + grid[..., 2]).max()) + CROP_MARGIN, width)
+    y1 = min(int((grid[..., 1] + grid[..., 3]).max()) + CROP_MARGIN, height)
+
+    grid = grid - np.array([x0, y0, 0, 0])
+
+    return (grid, *(image[y0:y1, x0:x1] for image in images))
@@ -0,0 +1,98 @@
+from collections import OrderedDict
+from hashlib import blake2b
+from typing import Any, Hashable
+
+# pip modules
+import numpy as np
+import cv2
+
+# import local modules
+from glyphs import CELL_INSET
+
+# objects needed by the scorer and the pool
+__all__ = ['ImageCache', 'PerceptualCache', 'digest', 'grid_hash']
+
+# side length each cell is shrunk to before hashing. Large enough that letters stay legible.
+CELL_HASH = 16
+
+# two boards are the same if every pair of cells differs in at most this many of their CELL_HASH**2 bits.
+# Re-encoded copies of a board stay under it, a single different letter does not.
+CELL_TOLERANCE = 8
+
+
+# exact key of an attachment
+def digest(image: bytes) -> bytes:
+    return blake2b(image, digest_size=16).digest()
+
+
+# perceptual key of a board, tolerant of re-encoding and rescaling
+def grid_hash(charmask: np.ndarray, grid: np.ndarray) -> bytes:
+    '''Return the bits of the character mask inside every cell, each shrunk to CELL_HASH x CELL_HASH, packed cell by cell'''
+
+    cells = []
+    for x, y, w, h in grid.reshape(-1, 4):
+        # leave out the tile borders, like the glyph classifier
+        dx, dy = int(w * CELL_INSET), int(h * CELL_INSET)
+        small = cv2.resize(charmask[y+dy : y+h-dy, x+dx : x+w-dx], (CELL_HASH, CELL_HASH), interpolation=cv2.INTER_AREA)
+        cells.append(np.packbits(small > 127))
+
+    return np.concatenate(cells).tobytes()
+
+################################################################################################################################################
+# ImageCache class:
+# bounded least recently used cache
+################################################################################################################################################
+class ImageCache:
+    '''LRU cache of parsed games.
+
+    ---
+    - capacity: number of entries kept before the least recently used one is evicted
+
+    Lookups are not counted here. Callers trace them as a stage ('digest' in the pool, 'board' in the
+    scorer), so the hit rate of both caches is stored with every latency window in the log.
+    '''
+
+    def __init__(self, capacity: int) -> None:
+        self.capacity = capacity
+        self._entries: OrderedDict[Hashable, Any] = OrderedDict()
+
+    def _find(self, key: Hashable) -> Hashable | None:
+        # the stored key matching this one
+        return key if key in self._entries else None
+
+    def get(self, key: Hashable) -> Any | None:
+        found = self._find(key)
+        if found is None:
+            return None
+
+        self._entries.move_to_end(found)
+        return self._entries[found]
+
+    def put(self, key: Hashable, value: Any) -> None:
+        self._entries[key] = value
+        self._entries.move_to_end(key)
+
+        # evict the least recently used entry
+        if len(self._entries) > self.capacity:
+            self._entries.popitem(last=False)
+
+################################################################################################################################################
+# PerceptualCache class:
+# ImageCache keyed on grid_hash, matching any stored board whose cells are all within CELL_TOLERANCE
+################################################################################################################################################
+class PerceptualCache(ImageCache):
+
+    def _find(self, key: bytes) -> bytes | None:
+        if key in self._entries or not self._entries:
+            return key if key in self._entries else None
+
+        # differing bits of every cell of every stored board at once
+        stored = list(self._entries)
+        cell_bytes = CELL_HASH * CELL_HASH // 8
+        boards = np.frombuffer(b''.join(stored), dtype=np.uint8).reshape(len(stored), -1, cell_bytes)
+        diff = np.unpackbits(boards ^ np.frombuffer(key, dtype=np.uint8).reshape(-1, cell_bytes), axis=-1).sum(axis=-1)
+
+        # nearest stored board whose every cell is close enough
+        worst = diff.max(axis=1)
+        best = worst.argmin()
+        return stored[best] if worst[best] <= CELL_TOLERANCE else None
@@ -0,0 +1,148 @@
+from datetime import date, timedelta
+from pickle import load, dump, UnpicklingError
+from os.path import exists
+from threading import Lock
+
+# pip modules
+from sortedcontainers import SortedList
+
+# objects needed by the database and the bot
+__all__ = ['Leaderboard', 'RANKINGS', 'CURRENT_RANKINGS', 'LEADERBOARD_SIZE', 'LEADERBOARD_MIN_GAMES', 'streak_cutoff']
+
+# number of players shown on a leaderboard
+LEADERBOARD_SIZE = 10
+
+# games a player needs before they are ranked by win rate or average guesses
+LEADERBOARD_MIN_GAMES = 5
+
+# every ranking: how a player's value is read from their User_Data row (None leaves them off the
+# ranking), and whether higher values rank first
+RANKINGS = {
+    'win_rate': (lambda r: r.wins / r.games if r.games >= LEADERBOARD_MIN_GAMES else None, True),
+    'avg_guesses': (lambda r: r.guesses / r.games if r.games >= LEADERBOARD_MIN_GAMES else None, False),
+    'streak': (lambda r: r.curr_streak or None, True),
+    'max_streak': (lambda r: r.max_streak or None, True),
+}
+
+# rankings of current streaks. A stored streak is only current while the player's last win was
+# today or yesterday, so players whose last win is older are left off.
+CURRENT_RANKINGS = ('streak',)
+
+
+# the oldest last win (YYYYMMDD) a current streak can have
+def streak_cutoff(today: date = None) -> int:
+    return int(((today or date.today()) - timedelta(days=1)).strftime('%Y%m%d'))
+
+
+################################################################################################################################################
+# Leaderboard class:
+# every player's place in every ranking, kept up to date one submission at a time
+################################################################################################################################################
+class Leaderboard:
+    '''Rankings of all players.
+
+    ---
+    Each ranking is a SortedList of (sort value, username) keys, plus the key of every player so their
+    old entry can be found. A submission moves the player in every ranking with one removal and one
+    insertion, each O(log n), and the top of a ranking is a slice of its list. Ties go to the username
+    that sorts first. Values that rank higher first are stored negated so every list sorts ascending.
+
+    Current rankings also keep every player's last win. Players whose streak has lapsed are dropped
+    once a day, the first time the leaderboard is read on a new day.
+
+    A lock lets the writer thread update it while the event loop reads it.
+    '''
+
+    def __init__(self, order: dict[str, list[tuple[float, str]]] = None, last_wins: dict[str, int] = None) -> None:
+        self._order = {ranking: SortedList(keys) for ranking, keys in (order or {ranking: [] for ranking in RANKINGS}).items()}
+        self._keys = {ranking: {key[1]: key for key in keys} for ranking, keys in self._order.items()}
+        self._lock = Lock()
+
+        # last win (YYYYMMDD) of every player in a current ranking, and the cutoff lapsed streaks were last dropped at
+        self._last_wins = last_wins or {}
+        self._cutoff = 0
+        self._expire(streak_cutoff())
+
+    def _expire(self, cutoff: int) -> None:
+        # drop the players whose streak lapsed before `cutoff`. Only does any work when the day changes.
+        if cutoff <= self._cutoff:
+            return
+        self._cutoff = cutoff
+
+        lapsed = {username for username, last_win in self._last_wins.items() if last_win < cutoff}
+        if not lapsed:
+            return
+
+        for ranking in CURRENT_RANKINGS:
+            order, keys = self._order[ranking], self._keys[ranking]
+            for username in lapsed:
+                if username in keys:
+                    order.remove(keys.pop(username))
+        for username in lapsed:
+            del self._last_wins[username]
+
+    def update(self, username: str, record) -> None:
+        '''Move a player to their place in every ranking given their User_Data row (a UserRecord)'''
+
+        with self._lock:
+            for ranking, (value_of, descending) in RANKINGS.items():
+                order, keys = self._order[ranking], self._keys[ranking]
+
+                # take out the old entry
+                old = keys.pop(username, None)
+                if old is not None:
+                    order.discard(old)
+
+                # and put in the new one, unless it is a streak that has already lapsed
+                value = value_of(record)
+                if ranking in CURRENT_RANKINGS:
+                    if value is not None and record.last_win >= self._cutoff:
+                        self._last_wins[username] = record.last_win
+                    else:
+                        self._last_wins.pop(username, None)
+                        value = None
+
+                if value is not None:
+                    key = keys[username] = (-value if descending else value, username)
+                    order.add(key)
+
+    def top(self, ranking: str, count: int = LEADERBOARD_SIZE, today: date = None) -> list[tuple[str, float]]:
+        '''Return the (username, value) of the first `count` players of a ranking'''
+
+        descending = RANKINGS[ranking][1]
+        with self._lock:
+            self._expire(streak_cutoff(today))
+            keys = self._order[ranking][:count]
+
+        return [(username, -value if descending else value) for value, username in keys]
+
+    def rank(self, ranking: str, username: str, today: date = None) -> int | None:
+        '''Return a player's place (1 is first) in a ranking, None if they are not ranked'''
+
+        with self._lock:
+            self._expire(streak_cutoff(today))
+            key = self._keys[ranking].get(username)
+            return None if key is None else self._order[ranking].bisect_left(key) + 1
+
+    def save(self, path: str, stamp: int) -> None:
+        # the rankings are stored as plain lists already in order, so loading them sorts in linear time
+        with open(path, 'wb') as f, self._lock:
+            dump((stamp, {ranking: list(order) for ranking, order in self._order.items()}, self._last_wins), f)
+
+    @classmethod
+    def load(cls, path: str, stamp: int) -> 'Leaderboard | None':
+        '''Return the leaderboard saved at `path` if it was saved with `stamp`, otherwise None'''
+
+        if not exists(path):
+            return None
+
+        try:
+            with open(path, 'rb') as f:
+                saved, order, last_wins = load(f)
+        except (OSError, EOFError, UnpicklingError, ValueError):
+            return None
+
+        if saved != stamp or set(order) != set(RANKINGS):
+            return None
+
+        return cls(order, last_wins)
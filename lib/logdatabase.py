@@ -1,16 +1,22 @@
-from sqlite3 import connect
+from sqlite3 import connect, OperationalError
 from os.path import exists
-from datetime import datetime
+from datetime import datetime, timedelta
 from atexit import register
 from traceback import format_tb
 from types import TracebackType
 from sys import exit
 
+# pip modules
+import numpy as np
+
+# import local modules
+from stages import bucket_percentile, LATENCY_BUCKETS
+
 # log path
 LOG_DB_PATH = './lib/logs/log.db'
 
 # log events
-LOG_EVENTS = {1: 'submit', 2: 'new', 3: 'doublesub', 4: 'invalid', 5: 'rolldie', 6: 'link', 7: 'exception', 8: 'su/sd'}
+LOG_EVENTS = {1: 'submit', 2: 'new', 3: 'doublesub', 4: 'invalid', 5: 'rolldie', 6: 'link', 7: 'exception', 8: 'su/sd', 9: 'busy', 10: 'leaderboard', 11: 'stats'}
 
 # convert datetime object into an int
 def dtime_to_dint(dtime:datetime) -> int:
@@ -84,6 +90,22 @@ class LogUpdate:
                     tb str);
                 ''')
 
+        # latency histograms were added later, so older logs get the table here
+        with self._log as _cur:
+            _cur.execute('''
+            CREATE TABLE IF NOT EXISTS Latency (
+                window_end int,
+                stage str,
+                bucket int,
+                count int)''')
+
+            # games of every window each stage finished reading, so its hit rate can be told from its count
+            _cur.execute('''
+            CREATE TABLE IF NOT EXISTS StageHits (
+                window_end int,
+                stage str,
+                hits int)''')
+
     def log_shutdown(self) -> None:
         # update log on bot shutdown
         self.update(datetime.now(), 'WordleBot', 'su/sd', 'WordleBot Shutting down')
@@ -123,6 +145,20 @@ class LogUpdate:
                         {event_time},
                         '{tb}')''')
 
+    def update_latency(self, dtime:datetime, histograms:dict, hits:dict) -> None:
+        # store one window of stage latency histograms (stage -> counts per bucket), skipping empty buckets,
+        # and the hits of every stage (stage -> games it finished reading)
+        window_end = dtime_to_dint(dtime)
+        rows = [
+            (window_end, stage, int(bucket), int(counts[bucket]))
+            for stage, counts in histograms.items()
+            for bucket in np.flatnonzero(counts)]
+
+        with self._log as _cur:
+            _cur.executemany('INSERT INTO Latency (window_end, stage, bucket, count) VALUES (?, ?, ?, ?)', rows)
+            _cur.executemany('INSERT INTO StageHits (window_end, stage, hits) VALUES (?, ?, ?)',
+                             [(window_end, stage, int(count)) for stage, count in hits.items()])
+
 # class to read the log
 class LogReader:
     def __init__(self) -> None:
@@ -146,13 +182,13 @@ class LogReader:
                 while True:
                     # prompt
                     print('Select Search Type: ')
-                    print('1: By User\n2: By Event\n3: By Timeframe\n4: Exception/Tracebacks\n5: All Logs')
+                    print('1: By User\n2: By Event\n3: By Timeframe\n4: Exception/Tracebacks\n5: All Logs\n6: Stage Latency')
                     # get user input
                     try: 
                         stype = input('> ')
                         # check that input is valid
                         stype = int(stype)
-                        assert(stype >= 1 and stype <= 5)
+                        assert(stype >= 1 and stype <= 6)
                         # break out of loop if no exceptions are raised
                         break
                     except (ValueError, AssertionError):
@@ -172,6 +208,8 @@ class LogReader:
                         self.exception_logs()
                     case 5:
                         self._all_logs()
+                    case 6:
+                        self.latency_logs()
                 
                 # clear screen 
                 print('\033[2J\033[H',end='')
@@ -228,7 +266,7 @@ class LogReader:
                 # loop until we get valid input
                 while True:
                     print('Pick an event to view: ')
-                    print('1: Game submissions\n2: New User added\n3: Double Submissions\n4: Invalid Games\n5: Die Rolls\n6: Link Requests\n7: Exceptions\n8: Startup/Shutdowns')
+                    print('1: Game submissions\n2: New User added\n3: Double Submissions\n4: Invalid Games\n5: Die Rolls\n6: Link Requests\n7: Exceptions\n8: Startup/Shutdowns\n9: Busy Scorer\n10: Leaderboard Requests\n11: Stats Requests')
                     # get user input, break if it is valid
                     try:
                         event_ind = input('> ')
@@ -285,6 +323,28 @@ class LogReader:
         return
 
 
+    def latency_logs(self) -> None:
+        # loop until we have valid user input
+        while True:
+            print('Enter how many hours back to include')
+            print('Leave blank to include all windows')
+            # get user input, break if input is valid
+            try:
+                hours = input('> ')
+                if len(str(hours)) == 0:
+                    hours = None
+                    break
+                hours = float(hours)
+                assert(hours > 0)
+                break
+            except (ValueError, AssertionError):
+                print('\033[2J\033[H',end='')
+                print(f'Invalid input: {hours}')
+
+        # send output to be printed or saved to file
+        manage_output(self._get_latency(hours))
+        return
+
         
     def _close_connection(self) -> None:
         # close connection to database
@@ -330,4 +390,33 @@ class LogReader:
         with self._log as _cur:
             users = _cur.execute('SELECT DISTINCT user from BotLog').fetchall()
         # return as a list of each username
-        return [(i, user[0]) for i, user in enumerate(users)]
\ No newline at end of file
+        return [(i, user[0]) for i, user in enumerate(users)]
+
+
+    def _get_latency(self, hours:float=None) -> list:
+        # sum the stored histogram windows of every stage
+        since = dtime_to_dint(datetime.now() - timedelta(hours=hours)) if hours else 0
+        try:
+            with self._log as _cur:
+                rows = _cur.execute(
+                    'SELECT stage, bucket, SUM(count) FROM Latency WHERE window_end >= ? GROUP BY stage, bucket',
+                    (since,)).fetchall()
+                hits = dict(_cur.execute(
+                    'SELECT stage, SUM(hits) FROM StageHits WHERE window_end >= ? GROUP BY stage',
+                    (since,)).fetchall())
+        # logs from before latency was recorded
+        except OperationalError:
+            rows, hits = [], {}
+
+        histograms = {}
+        for stage, bucket, count in rows:
+            histograms.setdefault(stage, np.zeros(len(LATENCY_BUCKETS) + 1, dtype=np.int64))[bucket] += count
+
+        # return one line per stage, percentiles in milliseconds. Windows stored before hits were kept have none.
+        entries = [f'{"stage":<20}{"count":>8}{"hit %":>8}{"p50 ms":>10}{"p95 ms":>10}{"p99 ms":>10}\n']
+        for stage, counts in sorted(histograms.items()):
+            p50, p95, p99 = (1000 * bucket_percentile(counts, p) for p in (50, 95, 99))
+            entries.append(f'{stage:<20}{counts.sum():>8}{100 * hits.get(stage, 0) / counts.sum():>8.1f}'
+                           f'{p50:>10.1f}{p95:>10.1f}{p99:>10.1f}\n')
+
+        return entries
@@ -0,0 +1,105 @@
+from os import environ
+from shlex import split
+
+# Tesseract's own threading fights with the scoring pool for cores, one thread per process is faster.
+# libtesseract reads this when it loads, so it is set before tesserocr is imported below.
+environ.setdefault('OMP_THREAD_LIMIT', '1')
+
+# pip modules
+from pytesseract import image_to_string
+import numpy as np
+
+# tesserocr links libtesseract directly. It is optional; without it every call spawns a tesseract process.
+try:
+    from tesserocr import PyTessBaseAPI
+except ImportError:
+    PyTessBaseAPI = None
+
+# objects needed by the scorer
+__all__ = ['OCRBackend', 'SubprocessOCR', 'TesserocrOCR', 'get_backend']
+
+
+################################################################################################################################################
+# OCRBackend class:
+# interface for turning a mask of characters into text
+################################################################################################################################################
+class OCRBackend:
+    '''Base class for OCR engines.
+
+    ---
+    Backends are constructed with a Tesseract command line style config string, e.g.
+    `--oem 3 --psm 6 -c tessedit_char_whitelist=ABC`, and return the recognized text from `recognize`.
+    '''
+
+    def __init__(self, config: str) -> None:
+        self.config = config
+
+    def recognize(self, image: np.ndarray) -> str:
+        '''Return the text found in a single channel 8-bit image'''
+        raise NotImplementedError
+
+    def close(self) -> None:
+        '''Release any resources held by the engine'''
+        pass
+
+    @staticmethod
+    def parse_config(config: str) -> tuple[int, int, dict[str, str]]:
+        '''Split a config string into its (oem, psm, variables)'''
+
+        oem, psm, variables = 3, 3, {}
+
+        args = split(config)
+        for flag, value in zip(args, args[1:]):
+            match flag:
+                case '--oem':
+                    oem = int(value)
+                case '--psm':
+                    psm = int(value)
+                case '-c':
+                    key, val = value.split('=', 1)
+                    variables[key] = val
+
+        return oem, psm, variables
+
+################################################################################################################################################
+# SubprocessOCR class:
+# runs the tesseract executable once per image through pytesseract
+################################################################################################################################################
+class SubprocessOCR(OCRBackend):
+
+    def recognize(self, image: np.ndarray) -> str:
+        return image_to_string(image=image, lang='eng', config=self.config)
+
+################################################################################################################################################
+# TesserocrOCR class:
+# keeps one Tesseract engine loaded for the life of the process
+################################################################################################################################################
+class TesserocrOCR(OCRBackend):
+
+    def __init__(self, config: str) -> None:
+        super().__init__(config)
+
+        # load the model once; this is the cost that SubprocessOCR pays on every image
+        oem, psm, variables = self.parse_config(config)
+        self._api = PyTessBaseAPI(lang='eng', oem=oem, psm=psm)
+        for key, val in variables.items():
+            self._api.SetVariable(key, val)
+
+    def recognize(self, image: np.ndarray) -> str:
+        # hand the pixels straight to the engine, no temp files
+        image = np.ascontiguousarray(image, dtype=np.uint8)
+        h, w = image.shape
+        self._api.SetImageBytes(image.tobytes(), w, h, 1, w)
+
+        return self._api.GetUTF8Text()
+
+    def close(self) -> None:
+        self._api.End()
+
+
+# pick the fastest backend that is installed
+def get_backend(config: str) -> OCRBackend:
+    if PyTessBaseAPI is not None:
+        return TesserocrOCR(config)
+
+    return SubprocessOCR(config)
@@ -0,0 +1,172 @@
+from argparse import ArgumentParser
+from asyncio import run, gather
+from datetime import datetime
+from json import dumps
+from resource import getrusage, RUSAGE_SELF, RUSAGE_CHILDREN
+from time import perf_counter
+
+# pip modules
+import numpy as np
+
+# import local modules
+from scorer import GameScorer, GameStats
+from scorepool import ScorePool
+from synthboard import SyntheticGame, THEMES, LETTER_SOURCES, generate
+
+# objects needed by benchmark.py
+__all__ = ['run_benchmark']
+
+# latency percentiles reported for every stage
+PERCENTILES = (50, 90, 99)
+
+
+# result of scoring one synthetic game
+def _outcome(game: SyntheticGame, result: GameStats | Exception, seconds: float | None) -> dict:
+    outcome = {'variant': game.variant, 'seconds': seconds, 'stages': [], 'error': None,
+               'read': False, 'guesses': False, 'tiles': False, 'stats': False}
+
+    if isinstance(result, Exception):
+        outcome['error'] = type(result).__name__
+        outcome['stages'] = getattr(result, 'stages', [])
+        return outcome
+
+    guesses = [''.join(row) for row in result.guessTable]
+    outcome['stages'] = result.stages
+    outcome['read'] = True
+    outcome['guesses'] = guesses == game.guesses
+    outcome['tiles'] = result.scoreTable.shape == game.scores.shape and bool((result.scoreTable == game.scores).all())
+    outcome['stats'] = result.numGuesses == len(game.guesses) and result.won == bool((game.scores[-1] == 2).all())
+
+    return outcome
+
+
+# score every game in this process, one at a time
+def _run_serial(games: list[SyntheticGame]) -> list[dict]:
+    scorer = GameScorer()
+    outcomes = []
+
+    for game in games:
+        start = perf_counter()
+        try:
+            result = scorer.scoreGame(game.image, game.date)
+        except Exception as e:
+            result = e
+        outcomes.append(_outcome(game, result, perf_counter() - start))
+
+    return outcomes
+
+
+# score every game at once through the process pool
+def _run_pool(games: list[SyntheticGame], workers: int) -> list[dict]:
+    pool = ScorePool(GameScorer(), workers=workers, max_pending=len(games))
+
+    async def score(game: SyntheticGame) -> dict:
+        start = perf_counter()
+        try:
+            result = await pool.score(game.image, game.date)
+        except Exception as e:
+            result = e
+        return _outcome(game, result, perf_counter() - start)
+
+    async def score_all() -> list[dict]:
+        return await gather(*(score(game) for game in games))
+
+    try:
+        return run(score_all())
+    finally:
+        # wait on the workers so their memory shows up in RUSAGE_CHILDREN
+        pool.shutdown(wait=True)
+
+
+# accuracy counters of a group of outcomes
+def _accuracy(outcomes: list[dict]) -> dict:
+    n = len(outcomes)
+    errors = {}
+    for o in outcomes:
+        if o['error']:
+            errors[o['error']] = errors.get(o['error'], 0) + 1
+
+    return {
+        'games': n,
+        'read': sum(o['read'] for o in outcomes) / n,
+        'guesses': sum(o['guesses'] for o in outcomes) / n,
+        'tiles': sum(o['tiles'] for o in outcomes) / n,
+        'stats': sum(o['stats'] for o in outcomes) / n,
+        'errors': errors,
+    }
+
+
+# latency percentiles (ms) and hit rate of every stage, plus the whole game
+def _latency(outcomes: list[dict]) -> dict:
+    samples: dict[str, list[tuple[bool, float]]] = {}
+    for o in outcomes:
+        for stage, hit, seconds in o['stages']:
+            samples.setdefault(stage, []).append((hit, seconds))
+    samples['total'] = [(o['read'], o['seconds']) for o in outcomes]
+
+    report = {}
+    for stage, entries in samples.items():
+        hits, seconds = zip(*entries)
+        ms = 1000 * np.array(seconds)
+        report[stage] = {
+            'attempts': len(entries),
+            'hit_rate': sum(hits) / len(entries),
+            **{f'p{p}_ms': float(np.percentile(ms, p)) for p in PERCENTILES},
+        }
+
+    return report
+
+
+# render synthetic screenshots, score them and print the results as JSON
+def run_benchmark(argv: list[str] = None) -> dict:
+    parser = ArgumentParser(description='Benchmark reading Wordle screenshots on synthetic games.')
+    parser.add_argument('-n', '--games', type=int, default=150, help='number of games to render')
+    parser.add_argument('-s', '--seed', type=int, default=0, help='seed for the random games')
+    parser.add_argument('-t', '--themes', nargs='+', choices=list(THEMES), default=None, help='themes to render')
+    parser.add_argument('-l', '--letters', choices=LETTER_SOURCES, default='font',
+                        help='draw letters with a font, or cut them from the glyph template screenshot (a self-consistency check only)')
+    parser.add_argument('-w', '--workers', type=int, default=0, help='score through a pool of this many processes (0 scores in this process)')
+    parser.add_argument('-o', '--output', default=None, help='write the JSON report here instead of stdout')
+    args = parser.parse_args(argv)
+
+    # render everything up front so only scoring is timed
+    start = perf_counter()
+    games = generate(args.games, seed=args.seed, themes=args.themes, letters=args.letters)
+    render_seconds = perf_counter() - start
+
+    start = perf_counter()
+    outcomes = _run_pool(games, args.workers) if args.workers else _run_serial(games)
+    seconds = perf_counter() - start
+
+    variants = {}
+    for o in outcomes:
+        variants.setdefault(o['variant'], []).append(o)
+
+    report = {
+        'date': datetime.now().isoformat(timespec='seconds'),
+        'games': len(games),
+        'workers': args.workers,
+        'seed': args.seed,
+        # letters cut from the template screenshot are what the glyph templates were made from, so
+        # their accuracy only shows the pipeline agrees with itself
+        'letters': args.letters,
+        'self_consistency': args.letters == 'template',
+        'render_seconds': render_seconds,
+        'seconds': seconds,
+        'images_per_second': len(games) / seconds,
+        # ru_maxrss is in kilobytes on linux
+        'peak_rss_mb': getrusage(RUSAGE_SELF).ru_maxrss / 1024,
+        'peak_rss_children_mb': getrusage(RUSAGE_CHILDREN).ru_maxrss / 1024,
+        'accuracy': _accuracy(outcomes),
+        'stages': _latency(outcomes),
+        'variants': {v: _accuracy(group) for v, group in sorted(variants.items())},
+    }
+
+    text = dumps(report, indent=2)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(text + '\n')
+    else:
+        print(text)
+
+    return report
@@ -0,0 +1,253 @@
+from asyncio import get_running_loop, wait_for, shield, to_thread, Future, TimerHandle, TimeoutError
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from multiprocessing import get_context
+from os import cpu_count
+from datetime import datetime
+from time import perf_counter
+
+from scorer import InvalidGame, GameScorer, GameStats
+from imagecache import ImageCache, digest
+
+# objects needed by wordle bot
+__all__ = ['ScorerBusy', 'ScorePool']
+
+# number of worker processes used to score games
+POOL_WORKERS = cpu_count() or 1
+
+# maximum number of games that may be waiting on (or running in) the pool at once
+POOL_MAX_PENDING = 4 * POOL_WORKERS
+
+# seconds a single game may take before the submission is abandoned
+POOL_TIMEOUT = 30
+
+# once every worker is busy, games wait up to this many seconds for others to share a batch with
+POOL_BATCH_WINDOW = 0.05
+
+# most games sent to a worker in one batch (their boards are read with a single OCR call)
+POOL_BATCH_SIZE = 8
+
+# number of attachments whose results are remembered, so exact re-posts never reach a worker
+POOL_CACHE_SIZE = 512
+
+# scorer owned by each worker process, created by _init_worker
+_scorer: GameScorer = None
+
+
+class ScorerBusy(Exception):
+    '''Exception raised if a game cannot be scored because the pool is saturated or too slow'''
+
+    def __init__(self, message: str) -> None:
+        super().__init__(message)
+        self.message = message
+
+
+# runs once in every worker process
+def _init_worker() -> None:
+    global _scorer
+    _scorer = GameScorer()
+
+
+# runs a batch of games in a worker process
+def _score_job(images: list[bytes], submissionDates: list[datetime]) -> list[GameStats | Exception]:
+    try:
+        # InvalidGame is expected and comes back in place of the game's stats
+        return _scorer.scoreGames(images, submissionDates)
+
+    except Exception as e:
+        # one bad game should not fail the others it was batched with, so retry them one at a time
+        if len(images) > 1:
+            return [_score_one(image, submissionDate) for image, submissionDate in zip(images, submissionDates)]
+
+        # anything else may not survive the trip back to the bot (an exception that cannot be
+        # unpickled breaks the whole pool), so send back its name and message instead
+        raise RuntimeError(f'{type(e).__name__}: {e}') from None
+
+
+# runs a single game in a worker process, returning the error instead of raising it
+def _score_one(image: bytes, submissionDate: datetime) -> GameStats | Exception:
+    try:
+        return _score_job([image], [submissionDate])[0]
+    except RuntimeError as e:
+        return e
+
+
+################################################################################################################################################
+# ScorePool class:
+# runs GameScorer.scoreGames in worker processes so image processing never blocks the event loop
+################################################################################################################################################
+class ScorePool:
+    '''Process pool for scoring games.
+
+    ---
+    - workers: number of worker processes (defaults to the number of cores)
+    - max_pending: number of games allowed in flight before new submissions are turned away
+    - timeout: seconds to wait on a single game
+    - batch_window / batch_size: how long and for how many games a batch is held open
+
+    A game goes straight to a worker while one is idle. During a burst, when every worker is busy,
+    games are held for up to batch_window seconds (or until batch_size arrive) and sent as one job,
+    so their boards share a single OCR call.
+
+    Games already read from an identical attachment are re-scored by `scorer` on the event loop,
+    which is cheap since the guesses and their scores are known.
+
+    Every game (or InvalidGame) comes back with the stages it went through, the digest lookup first,
+    so the bot can log how often each stage is reached and succeeds.
+    '''
+
+    def __init__(self, scorer: GameScorer, workers: int = POOL_WORKERS, max_pending: int = POOL_MAX_PENDING, timeout: float = POOL_TIMEOUT,
+                 batch_window: float = POOL_BATCH_WINDOW, batch_size: int = POOL_BATCH_SIZE) -> None:
+
+        self._scorer = scorer
+        self._workers = workers
+        self._max_pending = max_pending
+        self._timeout = timeout
+        self._batch_window = batch_window
+        self._batch_size = batch_size
+
+        # number of games currently waiting on the pool. Only touched from the event loop.
+        self._pending = 0
+
+        # jobs sent to the workers and not yet finished, and the games held for the next one
+        self._running = 0
+        self._batch: list[tuple[bytes, datetime, Future]] = []
+        self._flushTimer: TimerHandle = None
+
+        # guesses and scores of recent attachments, keyed by their digest
+        self.cache = ImageCache(POOL_CACHE_SIZE)
+
+        # set while a broken pool is being replaced, so the batches that fail meanwhile do not replace it again
+        self._restarting = False
+
+        self._executor = self._start('fork')
+
+    def _start(self, method: str) -> ProcessPoolExecutor:
+        # start every worker now. The executor starts all of its workers on the first submit, so a
+        # no-op job is enough to do this.
+        executor = ProcessPoolExecutor(
+            max_workers= self._workers,
+            mp_context= get_context(method),
+            initializer= _init_worker)
+        executor.submit(int).result()
+
+        return executor
+
+    async def score(self, image: bytes, submissionDate: datetime) -> GameStats:
+        '''Score a game in the pool and return its GameStats.
+        Raises InvalidGame if the game cannot be read, or ScorerBusy if the pool is full or the game times out.'''
+
+        # an identical attachment has been read before
+        start = perf_counter()
+        key = digest(image)
+        seen = self.cache.get(key)
+        lookup = ('digest', seen is not None, perf_counter() - start)
+        if seen is not None:
+            game = self._scorer.scoreTable(*seen, submissionDate)
+            game.stages = [lookup]
+            return game
+
+        # turn the submission away rather than queueing without bound
+        if self._pending >= self._max_pending:
+            raise ScorerBusy('The bot is busy scoring other games, try again in a minute.')
+
+        # the slot is held until a worker is done with the game, even if the submission is given up on
+        # first, so max_pending bounds the work in flight
+        self._pending += 1
+        future = self._enqueue(image, submissionDate)
+        future.add_done_callback(self._release)
+        try:
+            game = await wait_for(shield(future), self._timeout)
+
+        # the game could not be read, but the stages it went through still count
+        except InvalidGame as e:
+            e.stages = [lookup, *e.stages]
+            raise
+
+        # the worker keeps running the job, but the submission is given up on
+        except TimeoutError:
+            raise ScorerBusy('Scoring your game took too long, try again in a minute.')
+
+        game.stages = [lookup, *game.stages]
+        self.cache.put(key, (game.guessTable, game.scoreTable))
+        return game
+
+    def _release(self, future: Future) -> None:
+        # a game is done with its slot. The result of a submission that was given up on is dropped.
+        self._pending -= 1
+        if not future.cancelled():
+            future.exception()
+
+    def _enqueue(self, image: bytes, submissionDate: datetime) -> Future:
+        # add a game to the next batch and return the future its result will be set on
+        loop = get_running_loop()
+        future = loop.create_future()
+        self._batch.append((image, submissionDate, future))
+
+        # send it now if a worker is idle or the batch is full, otherwise give others a moment to join it
+        if self._running < self._workers or len(self._batch) >= self._batch_size:
+            self._flush()
+        elif self._flushTimer is None:
+            self._flushTimer = loop.call_later(self._batch_window, self._flush)
+
+        return future
+
+    def _flush(self) -> None:
+        # send the held games to the workers as one job
+        if self._flushTimer is not None:
+            self._flushTimer.cancel()
+            self._flushTimer = None
+
+        batch, self._batch = self._batch, []
+        if batch:
+            get_running_loop().create_task(self._run(batch))
+
+    async def _run(self, batch: list[tuple[bytes, datetime, Future]]) -> None:
+        # score a batch in a worker and hand every game its result
+        images, dates, futures = zip(*batch)
+        executor = self._executor
+        restart = False
+        self._running += 1
+        try:
+            results = await get_running_loop().run_in_executor(executor, _score_job, list(images), list(dates))
+
+        # a worker died (e.g. killed for memory); the pool is replaced once these games have their results
+        except BrokenProcessPool:
+            restart = executor is self._executor and not self._restarting
+            results = [ScorerBusy('Something went wrong while scoring your game, try again.')] * len(batch)
+
+        except Exception as e:
+            results = [e] * len(batch)
+
+        finally:
+            self._running -= 1
+
+        for future, result in zip(futures, results):
+            # the submission timed out and was already given up on
+            if future.done():
+                continue
+
+            if isinstance(result, Exception):
+                future.set_exception(result)
+            else:
+                future.set_result(result)
+
+        if restart:
+            await self._restart(executor)
+
+    async def _restart(self, executor: ProcessPoolExecutor) -> None:
+        # replace a broken pool so later submissions still work. The bot's threads and connections are
+        # running by now, so the new workers are not forked from this process but from a fresh, single
+        # threaded forkserver. Starting them loads a scorer in each, which takes seconds, so it is done
+        # on a thread to keep the event loop (and the whole client) running meanwhile. Games submitted
+        # until then reach the broken pool and are turned away.
+        self._restarting = True
+        executor.shutdown(wait=False, cancel_futures=True)
+        try:
+            self._executor = await to_thread(self._start, 'forkserver')
+        finally:
+            self._restarting = False
+
+    def shutdown(self, wait: bool = False) -> None:
+        # stop the workers without running games still queued, optionally waiting for them to exit
+        self._executor.shutdown(wait=wait, cancel_futures=True)
@@ -0,0 +1,602 @@
+# base python modules
+from datetime import datetime
+from enum import Enum
+from dataclasses import dataclass, field
+from time import perf_counter
+
+# pip modules
+import numpy as np
+import cv2
+
+# import local modules
+from wotd import get_wotd, get_cached_wotd, get_valid_words, FIRST_WORDLE
+from ocr import OCRBackend, get_backend
+from glyphs import GlyphClassifier, cell_grid, MIN_CONFIDENCE
+from gridlocate import decode, find_cells, crop_to_grid
+from decoder import WordDecoder, glyph_logp, ocr_logp
+from tiles import read_tiles
+from scoring import encode, score_codes, game_counts, CORRECT
+from feedback import GameAnalysis, FeedbackMatrix, gen_feedback, pattern_codes
+from imagecache import PerceptualCache, grid_hash
+from sharetext import parse_share
+from stages import StageTrace
+import ansi
+
+# objects needed by wordle bot and the scoring workers
+__all__ = ['InvalidGame', 'Score', 'GameStats', 'GameScorer']
+
+# number of boards remembered by each scorer
+BOARD_CACHE_SIZE = 256
+
+
+################################################################################################################################################
+# InvalidGame class:
+# Used by the GameScorer class whenever the results cannot be determined.
+################################################################################################################################################
+class InvalidGame(Exception):
+    def __init__(self, message: str, *args: object) -> None:
+        # pass the message along so the exception survives pickling between processes
+        super().__init__(message, *args)
+        self.message = message
+
+        # stages the game went through before it was given up on (set by GameScorer.scoreGame)
+        self.stages: list[tuple[str, bool, float]] = []
+
+################################################################################################################################################
+# Score class:
+# Used to represent the separate scores of individual letters.
+################################################################################################################################################
+class Score(Enum):
+    # values are the score codes used by the scoring kernel (see scoring.py)
+    CORRECT = 2
+    MISPLACED = 1
+    INCORRECT = 0
+
+    def __repr__(self) -> str:
+        match self:
+            case Score.CORRECT:
+                return ansi.green(self.name[0])
+            case Score.MISPLACED:
+                return ansi.yellow(self.name[0])
+            case Score.INCORRECT:
+                return ansi.bright_black(self.name[0])
+
+        raise AssertionError(f'Unexpected Score "{self.name}"')
+
+################################################################################################################################################
+# GameStats class:
+# used to store stats of a submitted game
+################################################################################################################################################
+@dataclass
+class GameStats:
+    """Game stats DTO"""
+
+    guessTable: np.ndarray | None
+    scoreTable: np.ndarray
+    numGuesses: int
+    solution: str | None
+    won: bool
+    uniqueCorrect: int
+    uniqueMisplaced: int
+    uniqueAll: int
+    totalCorrect: int
+    totalMisplaced: int
+    analysis: GameAnalysis | None = None
+    stages: list[tuple[str, bool, float]] = field(default_factory=list)
+
+################################################################################################################################################
+# _Board class:
+# a board that has been located but whose guesses may still need OCR
+################################################################################################################################################
+@dataclass
+class _Board:
+    """Partly read board DTO
+
+    ---
+    - color / gray / charmask: the screenshot cropped to the board
+    - grid: (6, 5, 4) cell boxes
+    - key: grid_hash of the board
+    - guesses: the guesses, or None if they still have to be read with OCR
+    - sims: glyph similarities (rows, 5, 26) if the glyph classifier could tell which rows were played"""
+
+    color: np.ndarray
+    gray: np.ndarray
+    charmask: np.ndarray
+    grid: np.ndarray
+    key: bytes
+    guesses: list[str] | None
+    sims: np.ndarray | None
+
+################################################################################################################################################
+# GameScorer class:
+# Image processing and scoring pipeline. Kept separate from the discord client so that it can be
+# constructed inside worker processes.
+################################################################################################################################################
+class GameScorer:
+
+    def __init__(self, ocr: OCRBackend = None, rowOcr: OCRBackend = None) -> None:
+
+        # Private members / constants
+        self._tessConfig = '--oem 3 --psm 6 -c tessedit_char_whitelist=ABCDEFGHIJKLMNOPQRSTUVWXYZ'
+        self._rowTessConfig = '--oem 3 --psm 7 -c tessedit_char_whitelist=ABCDEFGHIJKLMNOPQRSTUVWXYZ'
+        self._rowPadding = 8        # white border added around a single row so Tesseract sees a margin
+        self._upscale = 2           # factor rows are enlarged by before the last OCR attempt
+        self._batchCellHeight = 48  # cell height boards are scaled to when several are read in one OCR call
+        self._maxThresh = 255       # maximum pixel value
+        self._darkThresh = 0x26     # midpoint between the dark theme BG and the next darkest color
+        self._lightThresh = 0xeb    # midpoint between the light theme BG and the next brightest color
+        self._valid_words = get_valid_words()
+
+        # OCR engine, kept for the life of the scorer so the model is only loaded once
+        self._ocr = ocr or get_backend(self._tessConfig)
+
+        # Single line OCR engine for rows the whole board pass got wrong. Only loaded once it is needed.
+        self._rowOcr = rowOcr
+
+        # Template matcher used before falling back to OCR
+        self._glyphs = GlyphClassifier()
+
+        # Corrects misread rows to the most likely valid word
+        self._decoder = WordDecoder(self._valid_words)
+
+        # Guesses of recently read boards, keyed by a perceptual hash so re-encoded copies skip OCR
+        self._boards = PerceptualCache(BOARD_CACHE_SIZE)
+
+        # Feedback of every guess/answer pair, used to measure how much each guess narrowed things down
+        gen_feedback()
+        self._feedback = FeedbackMatrix()
+
+
+    def _guessesFromImage(self, image: bytes, trace: StageTrace) -> tuple[np.ndarray, np.ndarray | None]:
+        """Use the OCR backend to compile a list of the guesses.
+
+        The cheapest reader runs first, and each slower one only sees what the ones before it
+        could not read: the board cache, the glyph templates, whole board OCR, then OCR of the
+        rows that are still wrong.
+        
+        ---
+        ## Parameters
+
+        image : `bytes`
+            The user-provided screenshot of their Wordle game.
+
+        trace : `StageTrace`
+            Receives the hit and latency of every stage that was run.
+
+        ---
+        ## Returns
+
+        object : `tuple[np.ndarray, np.ndarray | None]`
+            A 2-D array of the words within the image, and a 2-D array of the score codes
+            read from the tile colors (None if the colors could not be read).
+
+        ---
+        ## Raises
+
+        InvalidGame
+            Unable to find a game in the image."""
+
+        return self._finishBoard(self._locateBoard(image, trace), trace)
+
+    def _locateBoard(self, image: bytes, trace: StageTrace) -> _Board:
+        """Find the board in the screenshot and read it without OCR if possible
+        (board cache, then glyph templates).
+
+        ---
+        ## Raises
+
+        InvalidGame
+            Unable to find a game in the image."""
+
+        ### Locate the board ###
+
+        with trace.span('locate'):
+
+            # Convert image (bytes) to OpenCV matrix (cv2.Mat), shrinking large screenshots while decoding, and get grayscale
+            color = decode(image)
+            if color is None:
+                raise InvalidGame('Could not find the game!')
+            gray = cv2.cvtColor(
+                src= color,
+                code= cv2.COLOR_BGR2GRAY)
+
+            # Determine user theme and create a mask of the character cells so we can find them
+            image_sides = [*gray[:1,:], *gray[-1:,:]]   # Topmost and bottommost rows of pixels
+            if np.median(image_sides) < 200:
+                _, cellmask = cv2.threshold(gray, self._darkThresh, self._maxThresh, cv2.THRESH_BINARY)
+            else:
+                _, cellmask = cv2.threshold(gray, self._lightThresh, self._maxThresh, cv2.THRESH_BINARY_INV)
+
+            cells = find_cells(cellmask)
+            if cells is None:
+                raise InvalidGame('Could not find the game!')
+
+            # Everything after this only looks at the board
+            grid, color, gray = crop_to_grid(cell_grid(cells), color, gray)
+
+            # Generate a mask of the characters
+            _, charmask = cv2.threshold(gray, self._lightThresh, self._maxThresh, cv2.THRESH_BINARY_INV)
+
+
+        ### Re-encoded copy of a board we have already read ###
+
+        start = perf_counter()
+        board = grid_hash(charmask, grid)
+        guess_list = self._boards.get(board)
+        trace.add('board', guess_list is not None, start)
+
+
+        ### Fast path: match the cells against the letter templates ###
+
+        # Only trust the templates if every letter is a confident match. Rows that are not words
+        # are corrected to the closest valid word.
+        sims = None
+        if guess_list is None:
+            start = perf_counter()
+            read = self._glyphs.classify(charmask, grid)
+            if read:
+                words, confidence, sims = read
+                if confidence >= MIN_CONFIDENCE:
+                    if all(g in self._valid_words for g in words):
+                        guess_list = words
+                    else:
+                        guess_list = self._decoder.decode(glyph_logp(sims))
+            trace.add('glyphs', guess_list is not None, start)
+
+        return _Board(color, gray, charmask, grid, board, guess_list, sims)
+
+    def _finishBoard(self, board: _Board, trace: StageTrace, batch: tuple[list[str], float] | None = None) -> tuple[np.ndarray, np.ndarray | None]:
+        """Read the rest of a located board: OCR if the guesses are still unknown, then the tile colors.
+        `batch` holds this board's lines and share of the time of an OCR call made for several boards.
+
+        ---
+        ## Raises
+
+        InvalidGame
+            Some row cannot be read as a valid word."""
+
+        # Otherwise fall back to OCR
+        guess_list = board.guesses
+        if guess_list is None:
+            guess_list = self._guessesFromOCR(board.gray, board.charmask, board.grid, board.sims, trace, batch)
+
+        self._boards.put(board.key, guess_list)
+
+
+        ### Read the tile colors ###
+
+        with trace.span('tiles'):
+            tiles = read_tiles(board.color, board.charmask, board.grid, len(guess_list))
+
+        # Return guesses as 2-D numpy array
+        return np.array( [list(g) for g in guess_list] ), tiles
+
+    def _rereadBoard(self, board: _Board, guesses: np.ndarray, tiles: np.ndarray | None, submissionDate: datetime,
+                     trace: StageTrace) -> np.ndarray:
+        """Read a board again with OCR if its guesses came from the board cache or the glyph templates
+        and do not match the cached word of the day. A confident template match can still misread a
+        letter, and the game should not be rejected for it. Returns the guesses to score the game with,
+        the first read if OCR cannot do better."""
+
+        wotd = get_cached_wotd(submissionDate)
+        if board.guesses is None or tiles is None or not wotd or not (tiles != self._scoreAgainst(guesses, wotd)).any():
+            return guesses
+
+        try:
+            guess_list = self._guessesFromOCR(board.gray, board.charmask, board.grid, board.sims, trace)
+        except InvalidGame:
+            return guesses
+
+        # Replace the misread board in the cache
+        self._boards.put(board.key, guess_list)
+
+        return np.array( [list(g) for g in guess_list] )
+
+    def _ocrBatch(self, boards: list[_Board]) -> dict[int, tuple[list[str], float]]:
+        """Read the played rows of several boards with a single OCR call.
+
+        The rows of every board are cut out without their tile borders, scaled to the same cell height
+        and stacked, so Tesseract's fixed cost per call is paid once. Only boards whose number of played rows is
+        known (from the glyph classifier) can be split back apart. Returns the lines and share of
+        the call's time of every board keyed by id(board), or nothing if the lines do not add up."""
+
+        if len(boards) < 2:
+            return {}
+
+        start = perf_counter()
+        masks = []
+        for board in boards:
+            grid = board.grid[:len(board.sims)]
+            mask = cv2.vconcat([self._rowMask(board.gray, board.charmask, cells) for cells in grid])
+
+            # same letter size for every board, kept black and white
+            scale = self._batchCellHeight / grid[0, 0, 3]
+            mask = cv2.resize(mask, None, fx=scale, fy=scale, interpolation=cv2.INTER_AREA)
+            _, mask = cv2.threshold(mask, 127, self._maxThresh, cv2.THRESH_BINARY)
+            masks.append(mask)
+
+        # pad to the widest board
+        width = max(m.shape[1] for m in masks)
+        mosaic = cv2.vconcat([
+            cv2.copyMakeBorder(m, 0, 0, 0, width - m.shape[1], cv2.BORDER_CONSTANT, value=self._maxThresh)
+            for m in masks])
+
+        text = self._ocr.recognize(mosaic)
+        lines = [line.strip() for line in text.lower().split('\n') if line.strip()]
+
+        # split the lines back up, board by board
+        rows = [len(board.sims) for board in boards]
+        if len(lines) != sum(rows):
+            return {}
+
+        share = (perf_counter() - start) / len(boards)
+        ends = np.cumsum(rows)
+        return {id(board): (lines[end-n:end], share) for board, n, end in zip(boards, rows, ends)}
+
+    def _guessesFromOCR(self, gray: np.ndarray, charmask: np.ndarray, grid: np.ndarray, sims: np.ndarray | None, trace: StageTrace,
+                        batch: tuple[list[str], float] | None = None) -> list[str]:
+        """Read the guesses from the character mask with the OCR backend.
+
+        The whole board is read in one pass first. Rows it gets wrong are read again one at a time,
+        then once more from an enlarged copy of the row with its own threshold. Lines that are not
+        valid words are corrected with the dictionary, using the glyph similarities `sims`
+        (from GlyphClassifier.classify) as extra evidence when they are known.
+
+        ---
+        ## Raises
+
+        InvalidGame
+            Some row cannot be read as a valid word."""
+
+        ### Whole board ###
+
+        start = perf_counter()
+        if batch is None:
+            # Generate mask and feed Tesseract :) *pat* *pat* good boy
+            stage = 'ocr'
+            top = grid[..., 1].min()
+            bottom = (grid[..., 1] + grid[..., 3]).max()
+            text = self._ocr.recognize(self._squeeze(charmask, grid[0], top, bottom))
+            lines = [line.strip() for line in text.strip().lower().split('\n')]
+        else:
+            # Already read along with other boards, charge this board its share of that call
+            stage = 'ocr_batch'
+            lines, shared = batch
+            start -= shared
+
+        # The glyph classifier knows how many rows were played, otherwise trust Tesseract
+        rows = len(sims) if sims is not None else len(lines)
+        if len(lines) == rows:
+            guess_list = [self._checkWord(line, sims, i) for i, line in enumerate(lines)]
+        else:
+            guess_list = [None] * rows
+        trace.add(stage, None not in guess_list, start)
+
+
+        ### Rows that are still unread ###
+
+        for stage, rowMask in (('ocr_rows', self._rowMask), ('ocr_rows_upscaled', self._upscaledRowMask)):
+            missing = [i for i, g in enumerate(guess_list) if g is None]
+            if not missing:
+                break
+
+            start = perf_counter()
+            for i in missing:
+                line = self._rowOCR().recognize(rowMask(gray, charmask, grid[i])).strip().lower()
+                guess_list[i] = self._checkWord(line, sims, i)
+            trace.add(stage, None not in guess_list, start)
+
+        # Validate guesses
+        if None in guess_list:
+            raise InvalidGame(f'Tesseract misidentified a word.\n  output = {lines}')
+
+        return guess_list
+
+    def _checkWord(self, line: str, sims: np.ndarray | None, row: int) -> str | None:
+        """Return the line if it is a valid word, else the valid word it was most likely misread
+        from, or None if there is no clear candidate."""
+
+        if line in self._valid_words:
+            return line
+
+        # Correct misread letters
+        logp = ocr_logp([line])
+        if logp is None:
+            return None
+        if sims is not None and row < len(sims):
+            logp += glyph_logp(sims[row])
+
+        return self._decoder.decode_row(logp[0])
+
+    def _squeeze(self, mask: np.ndarray, cells: np.ndarray, top: int, bottom: int) -> np.ndarray:
+        """Squeeze letters closer horizontally, one column of the grid at a time, between rows `top` and `bottom`."""
+
+        return cv2.hconcat([mask[top:bottom, x+w//4 : x+w-w//4] for x,_,w,_ in cells])
+
+    def _rowMask(self, gray: np.ndarray, charmask: np.ndarray, cells: np.ndarray) -> np.ndarray:
+        """Character mask of a single row, without the tile borders, with a margin."""
+
+        _,y,_,h = cells[0]
+        row = self._squeeze(charmask, cells, y+h//8, y+h-h//8)
+        return cv2.copyMakeBorder(row, *[self._rowPadding]*4, cv2.BORDER_CONSTANT, value=self._maxThresh)
+
+    def _upscaledRowMask(self, gray: np.ndarray, charmask: np.ndarray, cells: np.ndarray) -> np.ndarray:
+        """Character mask of a single row, enlarged from the grayscale image and thresholded on its own
+        (Otsu) instead of with the fixed light threshold. Helps with small or heavily compressed screenshots."""
+
+        _,y,_,h = cells[0]
+        row = self._squeeze(gray, cells, y+h//8, y+h-h//8)
+        row = cv2.resize(row, None, fx=self._upscale, fy=self._upscale, interpolation=cv2.INTER_CUBIC)
+        _, row = cv2.threshold(row, 0, self._maxThresh, cv2.THRESH_BINARY_INV | cv2.THRESH_OTSU)
+        return cv2.copyMakeBorder(row, *[self._rowPadding]*4, cv2.BORDER_CONSTANT, value=self._maxThresh)
+
+    def _rowOCR(self) -> OCRBackend:
+        # load the single line engine the first time a row needs it
+        if self._rowOcr is None:
+            self._rowOcr = get_backend(self._rowTessConfig)
+
+        return self._rowOcr
+
+    def _scoreAgainst(self, guesses: np.ndarray, wotd: str) -> np.ndarray:
+        """Score every letter of the guesses against the word of the day."""
+
+        return score_codes(encode(guesses), encode(wotd))
+
+    def _gameStats(self, guesses: np.ndarray, scores: np.ndarray, solution: str | None) -> GameStats:
+        """Tally the totals and unique letters of a scored game."""
+
+        counts = game_counts(encode(guesses), scores)
+
+        # The last guess is the solution if the game was won
+        if counts['won'] and not solution:
+            solution = ''.join(guesses[-1])
+
+        return GameStats(
+            guessTable= guesses,
+            scoreTable= scores,
+            solution= solution,
+            analysis= self._feedback.analyze([''.join(g) for g in guesses], pattern_codes(scores)),
+            **{k: v.item() for k, v in counts.items()}
+        )
+
+    def scoreGame(self, image: bytes, submissionDate: datetime) -> GameStats:
+        """Parse a screenshot of a Wordle game and return a GameStats object containing
+        information about the results.
+
+        The scores are read from the tile colors. The word of the day is only fetched
+        if the colors cannot be read, and is only used to check the colors if it is
+        already cached. A board read without OCR that does not match it is read again
+        with OCR before the game is rejected.
+        
+        ---
+        ## Parameters
+
+        image : `bytes`
+            The user-provided screenshot of their Wordle game.
+
+        submissionDate : `datetime`
+            A datetime object respresenting the time of submission.
+
+        ---
+        ## Returns
+
+        object : `GameStats`
+
+        ---
+        ## Raises
+
+        InvalidGame
+            Unable to read the game, or the game is not today's puzzle."""
+
+        # Read user guesses and tile colors, keeping track of which stages it took
+        game, = self.scoreGames([image], [submissionDate])
+        if isinstance(game, InvalidGame):
+            raise game
+
+        return game
+
+    def scoreGames(self, images: list[bytes], submissionDates: list[datetime]) -> list[GameStats | InvalidGame]:
+        """Score several screenshots at once. Boards that need OCR are read together in a single
+        OCR call where possible, so a burst of submissions pays Tesseract's fixed cost once.
+
+        ---
+        ## Returns
+
+        object : `list[GameStats | InvalidGame]`
+            The stats of every game, or the InvalidGame explaining why it could not be scored.
+            Both carry the stages the game went through."""
+
+        traces = [StageTrace() for _ in images]
+
+        # Everything that can be read without OCR
+        boards = []
+        for image, trace in zip(images, traces):
+            try:
+                boards.append(self._locateBoard(image, trace))
+            except InvalidGame as e:
+                boards.append(e)
+
+        # One OCR call for the boards still unread
+        batch = self._ocrBatch([b for b in boards if isinstance(b, _Board) and b.guesses is None and b.sims is not None])
+
+        games = []
+        for board, submissionDate, trace in zip(boards, submissionDates, traces):
+            try:
+                if isinstance(board, InvalidGame):
+                    raise board
+
+                guesses, tiles = self._finishBoard(board, trace, batch.get(id(board)))
+                guesses = self._rereadBoard(board, guesses, tiles, submissionDate, trace)
+
+                # Checking against the word of the day may have to fetch it
+                with trace.span('wotd'):
+                    game = self.scoreTable(guesses, tiles, submissionDate)
+                game.stages = trace
+
+            except InvalidGame as e:
+                e.stages = trace
+                game = e
+
+            games.append(game)
+
+        return games
+
+    def scoreTable(self, guesses: np.ndarray, tiles: np.ndarray | None, submissionDate: datetime) -> GameStats:
+        """Score a game that has already been read from a screenshot. Only touches the
+        network if `tiles` is None.
+
+        ---
+        ## Raises
+
+        InvalidGame
+            The game is not today's puzzle, or its colors could not be read and the word
+            of the day is not known."""
+
+        wotd = get_cached_wotd(submissionDate)
+
+        # Colors could not be read, so score against the word of the day
+        if tiles is None:
+            wotd = wotd or get_wotd(submissionDate)
+            if wotd is None:
+                raise InvalidGame('Could not read the colors of that game, try a clearer screenshot!')
+            return self._gameStats(guesses, self._scoreAgainst(guesses, wotd), wotd)
+
+        # The colors must agree with the word of the day if we already know it
+        if wotd and (tiles != self._scoreAgainst(guesses, wotd)).any():
+            raise InvalidGame('That game does not match today\'s word!')
+
+        return self._gameStats(guesses, tiles, wotd)
+
+    def scoreShare(self, text: str, submissionDate: datetime) -> GameStats:
+        """Score the text from Wordle's share button.
+
+        The share only has tile colors, so no image processing or network access is needed. The
+        letters are unknown: every green in a column is the same letter, and every other tile is
+        counted as a new letter, so the unique counts are an upper bound.
+
+        ---
+        ## Raises
+
+        InvalidGame
+            The text is not a share of today's puzzle."""
+
+        try:
+            number, scores = parse_share(text)
+        except ValueError as e:
+            raise InvalidGame(str(e))
+
+        # The wordle number counts days from the first puzzle
+        day = submissionDate.date() if isinstance(submissionDate, datetime) else submissionDate
+        if number != (day - FIRST_WORDLE).days:
+            raise InvalidGame(f'That share is for Wordle {number}, not today\'s!')
+
+        # Stand-in letter codes: a green is its column's letter, anything else is a letter of its own
+        letters = np.where(scores == CORRECT, np.arange(5), 26 + np.arange(scores.size).reshape(scores.shape))
+        counts = game_counts(letters.astype(np.uint8), scores)
+
+        return GameStats(
+            guessTable= None,
+            scoreTable= scores,
+            solution= get_cached_wotd(submissionDate),
+            **{k: v.item() for k, v in counts.items()}
+        )
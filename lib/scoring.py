@@ -0,0 +1,82 @@
+# pip modules
+import numpy as np
+
+# objects needed by the scorer
+__all__ = ['INCORRECT', 'MISPLACED', 'CORRECT', 'PAD', 'encode', 'score_codes', 'game_counts']
+
+# score codes. These are also the base-3 digits of a Wordle feedback pattern.
+INCORRECT, MISPLACED, CORRECT = 0, 1, 2
+
+# letter code used to pad games with fewer than six guesses
+PAD = 255
+
+# i < j for a pair of letter positions (j, i), used to find earlier duplicates of a letter
+_EARLIER = np.tri(5, k=-1, dtype=bool)
+
+
+# convert words to letter codes
+def encode(words: list[str] | np.ndarray) -> np.ndarray:
+    '''Return a uint8 array of shape (..., 5) with a=0 ... z=25.
+    Accepts a list of words or an array of single characters (e.g. GameStats.guessTable).'''
+
+    words = np.asarray(words)
+    if words.dtype.itemsize != 4 or words.shape[-1:] != (5,):
+        words = words.astype('U5')[..., None].view('U1')
+
+    return (words.view(np.uint32) - ord('a')).astype(np.uint8)
+
+
+# score guesses against answers
+def score_codes(guesses: np.ndarray, answers: np.ndarray) -> np.ndarray:
+    '''Return the int8 score codes of every letter.
+
+    ---
+    guesses has shape (..., rows, 5) and answers (..., 5), both uint8 letter codes; the leading
+    dimensions broadcast, so a batch of games or every guess against every answer can be scored
+    in one call. Padded rows (PAD) score INCORRECT.'''
+
+    answers = answers[..., None, :]
+
+    # greens consume their answer letter
+    green = guesses == answers
+    unmatched = ~green[..., None, :]
+
+    # a letter is yellow if the answer has more unmatched copies of it than earlier non-green copies in the guess
+    available = ((guesses[..., :, None] == answers[..., None, :]) & unmatched).sum(axis=-1)
+    used = ((guesses[..., :, None] == guesses[..., None, :]) & unmatched & _EARLIER).sum(axis=-1)
+    yellow = ~green & (used < available)
+
+    return np.select([green, yellow], [CORRECT, MISPLACED], INCORRECT).astype(np.int8)
+
+
+# tally the stats of scored games
+def game_counts(guesses: np.ndarray, scores: np.ndarray) -> dict[str, np.ndarray]:
+    '''Return the GameStats counters for a batch of games.
+
+    ---
+    guesses is (..., rows, 5) uint8 letter codes padded with PAD, and scores the matching score codes.
+    The result maps numGuesses, won, uniqueCorrect, uniqueMisplaced, uniqueAll, totalCorrect and
+    totalMisplaced to arrays with the leading (batch) shape.'''
+
+    rows = guesses.shape[-2]
+    played = (guesses != PAD).all(axis=-1)
+    green = (scores == CORRECT) & played[..., None]
+    yellow = (scores == MISPLACED) & played[..., None]
+
+    # a letter is unique the first time it is played in its column
+    repeats = (guesses[..., :, None, :] == guesses[..., None, :, :]) & np.tri(rows, k=-1, dtype=bool)[:, :, None]
+    first = ~repeats.any(axis=-2) & played[..., None]
+
+    # the game is won if the last guess is all green
+    numGuesses = played.sum(axis=-1)
+    won = np.take_along_axis(green.all(axis=-1), numGuesses[..., None] - 1, axis=-1)[..., 0]
+
+    return {
+        'numGuesses': numGuesses,
+        'won': won,
+        'uniqueCorrect': (first & green).sum(axis=(-2, -1)),
+        'uniqueMisplaced': (first & yellow).sum(axis=(-2, -1)),
+        'uniqueAll': first.sum(axis=(-2, -1)),
+        'totalCorrect': green.sum(axis=(-2, -1)),
+        'totalMisplaced': yellow.sum(axis=(-2, -1)),
+    }
@@ -0,0 +1,58 @@
+from re import search, findall
+
+# pip modules
+import numpy as np
+
+# import local modules
+from scoring import INCORRECT, MISPLACED, CORRECT
+
+# objects needed by the scorer and the bot
+__all__ = ['parse_share', 'share_grid']
+
+# header of the share text, e.g. "Wordle 1,024 4/6*" (the * marks hard mode)
+HEADER = r'Wordle\s+([\d,.]+)\s+([1-6X])/6\*?'
+
+# score of each tile emoji, including high contrast mode (orange/blue) and both themes' blanks
+TILES = {
+    '🟩': CORRECT,
+    '🟧': CORRECT,
+    '🟨': MISPLACED,
+    '🟦': MISPLACED,
+    '⬛': INCORRECT,
+    '⬜': INCORRECT,
+}
+
+# emoji used to draw a score table
+EMOJI = {CORRECT: '🟩', MISPLACED: '🟨', INCORRECT: '⬛'}
+
+
+# read the wordle number and tile scores out of Wordle's share text
+def parse_share(text: str) -> tuple[int, np.ndarray]:
+    '''Return the wordle number and a (rows, 5) int8 array of score codes.
+    Raises ValueError (with a message fit for the user) if the text is not a share.'''
+
+    header = search(HEADER, text)
+    if not header:
+        raise ValueError('Could not find the "Wordle ### #/6" line, paste the whole share text!')
+
+    number = int(header.group(1).replace(',', '').replace('.', ''))
+    result = header.group(2)
+
+    # newlines are not guaranteed (slash command options are a single line), so just take the tiles in order
+    tiles = findall('|'.join(TILES), text[header.end():])
+    if not tiles or len(tiles) % 5 or len(tiles) > 30:
+        raise ValueError('The tiles in that share are incomplete!')
+
+    scores = np.array([TILES[t] for t in tiles], dtype=np.int8).reshape(-1, 5)
+    won = (scores[-1] == CORRECT).all()
+
+    # the header and the grid have to tell the same story
+    if (result == 'X' and (won or len(scores) != 6)) or (result != 'X' and (not won or len(scores) != int(result))):
+        raise ValueError('The tiles in that share do not match its score!')
+
+    return number, scores
+
+
+# draw a score table with tile emoji
+def share_grid(scores: np.ndarray) -> str:
+    return '\n'.join(''.join(EMOJI[s] for s in row) for row in scores)
@@ -0,0 +1,79 @@
+from contextlib import contextmanager
+from time import perf_counter
+from typing import Iterator
+
+# pip modules
+import numpy as np
+
+# objects needed by the scorer, the pool, the bot and the log
+__all__ = ['StageTrace', 'LatencyHistograms', 'LATENCY_BUCKETS', 'bucket_percentile']
+
+# upper edges (seconds) of the latency histogram buckets: 0.1ms to 100s, ten per decade.
+# Anything slower lands in one last bucket.
+LATENCY_BUCKETS = np.logspace(-4, 2, 61)
+
+
+# percentile of a histogram over LATENCY_BUCKETS
+def bucket_percentile(counts: np.ndarray, p: float) -> float:
+    '''Return the upper edge (seconds) of the bucket holding the p-th percentile, inf if it is past the last edge'''
+
+    cumulative = np.cumsum(counts)
+    bucket = int(np.searchsorted(cumulative, cumulative[-1] * p / 100))
+
+    return float(LATENCY_BUCKETS[bucket]) if bucket < len(LATENCY_BUCKETS) else float('inf')
+
+
+################################################################################################################################################
+# StageTrace class:
+# the stages a single game went through, in order
+################################################################################################################################################
+class StageTrace(list):
+    '''List of (stage, hit, seconds) tuples. Small enough to travel back from a worker with the GameStats.'''
+
+    def add(self, stage: str, hit: bool, start: float) -> None:
+        '''Record a stage that began at `start` (a perf_counter reading) and has just finished'''
+        self.append((stage, bool(hit), perf_counter() - start))
+
+    @contextmanager
+    def span(self, stage: str) -> Iterator[None]:
+        '''Time the body of a with statement as a stage. It is a hit unless it raises.'''
+
+        start = perf_counter()
+        try:
+            yield
+        except BaseException:
+            self.add(stage, False, start)
+            raise
+        self.add(stage, True, start)
+
+################################################################################################################################################
+# LatencyHistograms class:
+# latency and hits of every stage since the last drain, bucketed so percentiles survive aggregation
+################################################################################################################################################
+class LatencyHistograms:
+    '''Rolling latency histograms.
+
+    ---
+    Traces are counted into LATENCY_BUCKETS per stage, along with how many of them the stage finished
+    reading. `drain` hands back the counts of the current window and starts a new one, so windows can
+    be stored and summed later for any time range. A stage's hit rate is its hits over its total count.
+    '''
+
+    def __init__(self) -> None:
+        self._counts: dict[str, np.ndarray] = {}
+        self._hits: dict[str, int] = {}
+
+    def record(self, trace: list[tuple[str, bool, float]]) -> None:
+        for stage, hit, seconds in trace:
+            counts = self._counts.get(stage)
+            if counts is None:
+                counts = self._counts[stage] = np.zeros(len(LATENCY_BUCKETS) + 1, dtype=np.int64)
+            counts[np.searchsorted(LATENCY_BUCKETS, seconds)] += 1
+            self._hits[stage] = self._hits.get(stage, 0) + hit
+
+    def drain(self) -> tuple[dict[str, np.ndarray], dict[str, int]]:
+        '''Return the counts and hits of every stage in the current window and start a new one'''
+
+        counts, self._counts = self._counts, {}
+        hits, self._hits = self._hits, {}
+        return counts, hits
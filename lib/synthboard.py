@@ -0,0 +1,261 @@
+from dataclasses import dataclass
+from datetime import date, timedelta
+from string import ascii_lowercase
+
+# pip modules
+import numpy as np
+import cv2
+
+# import local modules
+from wotd import get_word_order, get_valid_words, get_cached_wotd, FIRST_WORDLE
+from glyphs import TEMPLATE_SOURCE, TEMPLATE_LABELS, CELL_INSET, cell_grid
+from gridlocate import find_cells
+from scoring import encode, score_codes, INCORRECT, MISPLACED, CORRECT
+
+# objects needed by the benchmark
+__all__ = ['SyntheticGame', 'THEMES', 'RESOLUTIONS', 'JPEG_QUALITIES', 'LETTER_SOURCES', 'random_game', 'render_board', 'generate']
+
+# BGR colors of each theme: background, empty tile border, scores, letters and unused keyboard keys (and their letters)
+THEMES = {
+    'dark': {
+        'background': (0x13, 0x12, 0x12), 'border': (0x3c, 0x3a, 0x3a), 'text': (0xff, 0xff, 0xff), 'key': (0x84, 0x83, 0x81), 'key_text': (0xff, 0xff, 0xff),
+        INCORRECT: (0x3c, 0x3a, 0x3a), MISPLACED: (0x3b, 0x9f, 0xb5), CORRECT: (0x4e, 0x8d, 0x53),
+    },
+    'light': {
+        'background': (0xff, 0xff, 0xff), 'border': (0xda, 0xd6, 0xd3), 'text': (0xff, 0xff, 0xff), 'key': (0xda, 0xd6, 0xd3), 'key_text': (0x00, 0x00, 0x00),
+        INCORRECT: (0x7e, 0x7c, 0x78), MISPLACED: (0x58, 0xb4, 0xc9), CORRECT: (0x64, 0xaa, 0x6a),
+    },
+    'contrast': {
+        'background': (0x13, 0x12, 0x12), 'border': (0x3c, 0x3a, 0x3a), 'text': (0xff, 0xff, 0xff), 'key': (0x84, 0x83, 0x81), 'key_text': (0xff, 0xff, 0xff),
+        INCORRECT: (0x3c, 0x3a, 0x3a), MISPLACED: (0xf9, 0xc0, 0x85), CORRECT: (0x3a, 0x79, 0xf5),
+    },
+}
+
+# screenshot sizes (width, height): common phones, and a cropped desktop screenshot
+RESOLUTIONS = [(1080, 2400), (1170, 2532), (720, 1600), (1440, 3200), (450, 540)]
+
+# JPEG qualities screenshots are re-encoded at (None keeps the PNG)
+JPEG_QUALITIES = [None, 90, 75]
+
+# layout of the Wordle page in CSS pixels, scaled to fit the screenshot
+PAGE_WIDTH, PAGE_HEIGHT = 412, 760
+TILE, TILE_GAP, TILE_BORDER = 62, 5, 2
+BOARD_TOP = 120
+KEY_WIDTH, KEY_HEIGHT, KEY_GAP = 34, 58, 6
+KEYBOARD_ROWS = ['QWERTYUIOP', 'ASDFGHJKL', 'ZXCVBNM']
+
+# height of a letter as a fraction of its tile
+LETTER_HEIGHT = 0.38
+
+# where the letters are drawn from. 'font' draws them with an OpenCV font, which the glyph templates
+# know nothing about. 'template' cuts them out of the screenshot the glyph templates are cut from,
+# so reading them only checks the pipeline against itself.
+LETTER_SOURCES = ('font', 'template')
+
+# OpenCV font the letters are drawn with, and its stroke width as a fraction of the letter height (Wordle's letters are bold)
+LETTER_FONT = cv2.FONT_HERSHEY_DUPLEX
+LETTER_STROKE = 0.12
+
+# letter masks of every source, filled in by _letters
+_LETTERS: dict[str, dict[str, np.ndarray]] = {source: {} for source in LETTER_SOURCES}
+
+
+@dataclass
+class SyntheticGame:
+    """Rendered game DTO
+
+    ---
+    - image: encoded screenshot
+    - guesses / scores: what the scorer should read
+    - theme, resolution, quality: how it was rendered"""
+
+    image: bytes
+    guesses: list[str]
+    scores: np.ndarray
+    date: date
+    theme: str
+    resolution: tuple[int, int]
+    quality: int | None
+
+    @property
+    def variant(self) -> str:
+        return f'{self.theme}/{self.resolution[0]}x{self.resolution[1]}/{"png" if self.quality is None else f"q{self.quality}"}'
+
+
+# every letter as an alpha mask (0 = tile, 1 = letter)
+def _letters(source: str) -> dict[str, np.ndarray]:
+    if not _LETTERS[source]:
+        _LETTERS[source].update(_template_letters() if source == 'template' else _font_letters())
+
+    return _LETTERS[source]
+
+
+# draw every letter with LETTER_FONT, large so scaling it down anti-aliases it
+def _font_letters() -> dict[str, np.ndarray]:
+    letters = {}
+    for letter in ascii_lowercase:
+        canvas = np.zeros((200, 200), dtype=np.uint8)
+        (width, height), _ = cv2.getTextSize(letter.upper(), LETTER_FONT, 4, 1)
+        cv2.putText(canvas, letter.upper(), (100 - width // 2, 100 + height // 2), LETTER_FONT, 4, 255,
+                    max(int(height * LETTER_STROKE), 1), cv2.LINE_AA)
+
+        # crop to the letter
+        alpha = canvas.astype(np.float32) / 255
+        ys, xs = np.nonzero(alpha > 0.5)
+        letters[letter] = alpha[ys.min():ys.max()+1, xs.min():xs.max()+1]
+
+    return letters
+
+
+# cut every letter out of the template screenshot
+def _template_letters() -> dict[str, np.ndarray]:
+    letters = {}
+
+    gray = cv2.imread(TEMPLATE_SOURCE, cv2.IMREAD_GRAYSCALE)
+    _, cellmask = cv2.threshold(gray, 0x26, 255, cv2.THRESH_BINARY)
+    grid = cell_grid(find_cells(cellmask)).reshape(-1, 4)
+
+    for label, (x, y, w, h) in zip(TEMPLATE_LABELS, grid):
+        if label in letters:
+            continue
+
+        dx, dy = int(w * CELL_INSET), int(h * CELL_INSET)
+        cell = gray[y+dy : y+h-dy, x+dx : x+w-dx].astype(np.float32)
+
+        # scale so the tile is 0 and the letter is 1, then crop to the letter
+        tile = np.median(cell)
+        alpha = np.clip((cell - tile) / (255 - tile), 0, 1)
+        ys, xs = np.nonzero(alpha > 0.5)
+        letters[label] = alpha[ys.min():ys.max()+1, xs.min():xs.max()+1]
+
+    return letters
+
+
+# paint a letter onto the screenshot, centered in a box
+def _draw_letter(image: np.ndarray, letter: str, box: tuple[int, int, int, int], color: tuple[int, int, int], source: str) -> None:
+    x, y, w, h = box
+    alpha = _letters(source)[letter]
+
+    # scale to the height Wordle draws letters at
+    height = max(int(h * LETTER_HEIGHT), 1)
+    width = max(int(alpha.shape[1] * height / alpha.shape[0]), 1)
+    alpha = cv2.resize(alpha, (width, height), interpolation=cv2.INTER_AREA)[..., None]
+
+    x0, y0 = x + (w - width) // 2, y + (h - height) // 2
+    region = image[y0:y0+height, x0:x0+width]
+    region[:] = (region * (1 - alpha) + np.array(color) * alpha).astype(np.uint8)
+
+
+# pick an answer and a set of guesses
+def random_game(rng: np.random.Generator, rows: int | None = None) -> tuple[list[str], date]:
+    '''Return the guesses of a game (the last one is the answer if the game was won) and the date whose
+    answer it is. `rows` between 1 and 6 fixes the number of guesses, a lost game always has 6.'''
+
+    order = get_word_order()
+    words = sorted(get_valid_words())
+
+    # an answer from the word order whose date does not clash with an already fetched word of the day
+    while True:
+        day = int(rng.integers(len(order)))
+        dtime = FIRST_WORDLE + timedelta(days=day)
+        answer = order[day]
+        if answer in get_valid_words() and get_cached_wotd(dtime) in (None, answer):
+            break
+
+    rows = rows or int(rng.integers(1, 8))
+    won = rows <= 6
+    rows = min(rows, 6)
+
+    # misses are any other valid words
+    guesses = []
+    while len(guesses) < rows:
+        guess = words[rng.integers(len(words))]
+        if guess != answer:
+            guesses.append(guess)
+
+    if won:
+        guesses[-1] = answer
+
+    return guesses, dtime
+
+
+# draw a screenshot of a finished game
+def render_board(guesses: list[str], scores: np.ndarray, theme: str, resolution: tuple[int, int], letters: str = 'font') -> np.ndarray:
+    '''Return a BGR screenshot of the Wordle page with the board and keyboard'''
+
+    colors = THEMES[theme]
+    width, height = resolution
+    scale = min(width / PAGE_WIDTH, height / PAGE_HEIGHT)
+    px = lambda v: max(int(round(v * scale)), 1)
+
+    image = np.empty((height, width, 3), dtype=np.uint8)
+    image[:] = colors['background']
+
+    # header
+    cv2.line(image, (0, px(50)), (width, px(50)), colors['border'], px(1))
+    cv2.putText(image, 'Wordle', (width // 2 - px(50), px(36)), cv2.FONT_HERSHEY_TRIPLEX, scale, colors['key'], px(1), cv2.LINE_AA)
+
+    # board, centered
+    tile, gap = px(TILE), px(TILE_GAP)
+    left = (width - 5 * tile - 4 * gap) // 2
+    top = px(BOARD_TOP)
+
+    for r, c in np.ndindex(6, 5):
+        x, y = left + c * (tile + gap), top + r * (tile + gap)
+
+        if r < len(guesses):
+            cv2.rectangle(image, (x, y), (x + tile - 1, y + tile - 1), colors[int(scores[r, c])], cv2.FILLED)
+            _draw_letter(image, guesses[r][c], (x, y, tile, tile), colors['text'], letters)
+        else:
+            cv2.rectangle(image, (x, y), (x + tile - 1, y + tile - 1), colors['border'], px(TILE_BORDER))
+
+    # keyboard, keys take the best score their letter got
+    best = {}
+    for guess, row in zip(guesses, scores):
+        for letter, score in zip(guess, row):
+            best[letter] = max(best.get(letter, -1), int(score))
+
+    key_w, key_h, key_gap = px(KEY_WIDTH), px(KEY_HEIGHT), px(KEY_GAP)
+    bottom = height - px(16)
+    for k, keys in enumerate(KEYBOARD_ROWS):
+        y = bottom - (len(KEYBOARD_ROWS) - k) * (key_h + key_gap)
+        x0 = (width - len(keys) * (key_w + key_gap) + key_gap) // 2
+        for i, key in enumerate(keys):
+            x = x0 + i * (key_w + key_gap)
+            used = key.lower() in best
+            color = colors[best[key.lower()]] if used else colors['key']
+            cv2.rectangle(image, (x, y), (x + key_w - 1, y + key_h - 1), color, cv2.FILLED)
+            _draw_letter(image, key.lower(), (x, y, key_w, key_h), colors['text' if used else 'key_text'], letters)
+
+    return image
+
+
+# render random games covering every theme, resolution and quality
+def generate(count: int, seed: int = 0, themes: list[str] = None, resolutions: list[tuple[int, int]] = None,
+             qualities: list[int | None] = None, letters: str = 'font') -> list[SyntheticGame]:
+    '''Return `count` games cycling through the variants, with a random number of rows (1-6, won or lost)'''
+
+    rng = np.random.default_rng(seed)
+    themes = themes or list(THEMES)
+    resolutions = resolutions or RESOLUTIONS
+    qualities = qualities or JPEG_QUALITIES
+
+    games = []
+    for i in range(count):
+        theme = themes[i % len(themes)]
+        resolution = resolutions[(i // len(themes)) % len(resolutions)]
+        quality = qualities[(i // (len(themes) * len(resolutions))) % len(qualities)]
+
+        guesses, dtime = random_game(rng)
+        answer = get_word_order()[(dtime - FIRST_WORDLE).days]
+        scores = score_codes(encode(guesses), encode(answer))
+
+        image = render_board(guesses, scores, theme, resolution, letters)
+        if quality is None:
+            data = cv2.imencode('.png', image)[1].tobytes()
+        else:
+            data = cv2.imencode('.jpg', image, [cv2.IMWRITE_JPEG_QUALITY, quality])[1].tobytes()
+
+        games.append(SyntheticGame(data, guesses, scores, dtime, theme, resolution, quality))
+
+    return games
@@ -0,0 +1,58 @@
+# pip modules
+import numpy as np
+import cv2
+
+# import local modules
+from scoring import INCORRECT, MISPLACED, CORRECT
+
+# objects needed by the scorer
+__all__ = ['read_tiles']
+
+# fraction of a cell's width trimmed from each edge so tile borders are not sampled
+TILE_INSET = 0.12
+
+# tiles with less saturation than this are grey (both themes)
+GREY_SATURATION = 60
+
+# OpenCV hue ranges (0-180) of the tile colors, including high contrast mode (orange/blue)
+ORANGE_HUE = (0, 15)
+YELLOW_HUE = (15, 35)
+GREEN_HUE = (35, 85)
+BLUE_HUE = (85, 130)
+
+
+# read the score of every guessed letter from the tile colors
+def read_tiles(color: np.ndarray, charmask: np.ndarray, grid: np.ndarray, rows: int) -> np.ndarray | None:
+    '''Return a (rows, 5) int8 array of score codes, or None if any tile is not a Wordle color.
+
+    ---
+    color is the BGR screenshot, charmask the character mask (tiles are 255, letters 0),
+    and grid the (6, 5, 4) cell boxes from glyphs.cell_grid.'''
+
+    fills = np.zeros((rows, 5, 3), dtype=np.uint8)
+
+    for r, c in np.ndindex(rows, 5):
+        x, y, w, h = grid[r, c]
+        dx, dy = int(w * TILE_INSET), int(h * TILE_INSET)
+
+        # sample the tile around the letter, never the letter itself
+        tile = color[y+dy : y+h-dy, x+dx : x+w-dx]
+        bg = charmask[y+dy : y+h-dy, x+dx : x+w-dx] == 255
+        if not bg.any():
+            return None
+        fills[r, c] = np.median(tile[bg], axis=0)
+
+    # classify all tiles at once by hue and saturation
+    hsv = cv2.cvtColor(fills, cv2.COLOR_BGR2HSV)
+    hue, sat = hsv[..., 0], hsv[..., 1]
+
+    between = lambda bounds: (hue >= bounds[0]) & (hue < bounds[1])
+    grey = sat < GREY_SATURATION
+    correct = ~grey & (between(GREEN_HUE) | between(ORANGE_HUE) | (hue >= 170))
+    misplaced = ~grey & (between(YELLOW_HUE) | between(BLUE_HUE))
+
+    # a tile that is none of the colors means this is not a finished Wordle board
+    if not (grey | correct | misplaced).all():
+        return None
+
+    return np.select([correct, misplaced], [CORRECT, MISPLACED], INCORRECT).astype(np.int8)
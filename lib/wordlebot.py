@@ -1,63 +1,45 @@
 # base python modules
 from datetime import datetime
-from enum import Enum, auto
-from collections import Counter
-from dataclasses import dataclass
 from random import choice
+from asyncio import to_thread
 
 # pip modules
 from discord import Intents, Object, ButtonStyle, Embed, File, User, Color
 from discord.ui import Button, View
-from discord.ext import commands
-from pytesseract import image_to_string
-import numpy as np
-import cv2
+from discord.ext import commands, tasks
 
 # import local modules
 from botdatabase import *
-from wotd import gen_files, get_wotd, get_valid_words
-import ansi
+from wotd import gen_files, prefetch_wotd
 from logger import BotLog
+from logdatabase import LogUpdate
+from stages import StageTrace, LatencyHistograms
+from scorer import *
+from scorepool import *
+from sharetext import share_grid
 
+# minutes of submissions covered by each stored window of latency histograms
+LATENCY_WINDOW = 15
 
-################################################################################################################################################
-# InvalidGame class:
-# Used by the WordleBot class whenever the results cannot be determined.
-################################################################################################################################################
-class InvalidGame(Exception):
-    def __init__(self, message: str, *args: object) -> None:
-        super().__init__(*args)
-        self.message = message
+# title of every ranking and how its values are shown
+RANKING_TITLES = {
+    'win_rate': ('Win Rate', lambda v: f'{v * 100:.02f}%'),
+    'avg_guesses': ('Average Guesses', lambda v: f'{v:.02f}'),
+    'streak': ('Streak', str),
+    'max_streak': ('Max Streak', str),
+}
 
-################################################################################################################################################
-# Score class:
-# Used to represent the separate scores of individual letters.
-################################################################################################################################################
-class Score(Enum):
-    CORRECT = auto()
-    MISPLACED = auto()
-    INCORRECT = auto()
-
-    def __repr__(self) -> str:
-        match self:
-            case Score.CORRECT:
-                return ansi.green(self.name[0])
-            case Score.MISPLACED:
-                return ansi.yellow(self.name[0])
-            case Score.INCORRECT:
-                return ansi.bright_black(self.name[0])
-
-        raise AssertionError(f'Unexpected Score "{self.name}"')
 
 ################################################################################################################################################
 # SubmissionEmbed class:
 # used to display a users results after a game
 ################################################################################################################################################
 class SubmissionEmbed(Embed):
-    def __init__(self, date: datetime, user: User, stats: BaseStats, attachment_filename: str):
+    def __init__(self, date: datetime, user: User, stats: BaseStats, attachment_filename: str | None, game: GameStats = None):
         super().__init__(
             color= Color.random(),
-            description= None,
+            # without a screenshot to show, draw the tiles instead
+            description= share_grid(game.scoreTable) if game and not attachment_filename else None,
             timestamp= None)
 
         # self.set_image(url='https://external-content.duckduckgo.com/iu/?u=https%3A%2F%2Fimgc.allpostersimages.com%2Fimg%2Fposters%2Fsteve-buscemi-smiling-in-close-up-portrait_u-L-Q1171600.jpg%3Fh%3D550%26p%3D0%26w%3D550%26background%3Dffffff&f=1&nofb=1')
@@ -66,11 +48,84 @@ class SubmissionEmbed(Embed):
             ).add_field(name='Win Rate', value=f'{stats.win_rate:.02f}%', inline=False
             ).add_field(name='Streak', value=stats.streak, inline=False
             ).add_field(name='Max Streak', value=stats.max_streak, inline=False
-            ).set_image(url=f'attachment://{attachment_filename}'
             # ).set_author(name=user.display_name, icon_url=user.display_avatar.url
             ).set_footer(icon_url=user.display_avatar.url, text=f'{user.display_name}  ∙  {date}'
         )
 
+        if attachment_filename:
+            self.set_image(url=f'attachment://{attachment_filename}')
+
+        # how much of the game was good guessing and how much was good fortune
+        if game and game.analysis:
+            analysis = game.analysis
+            self.add_field(
+                name='Skill vs Luck',
+                value=f'`{analysis.skill:.1f}` bits of skill, `{analysis.luck:+.1f}` bits of luck\n'
+                      f'Possible answers: {" → ".join(map(str, analysis.remaining))}',
+                inline=False)
+
+################################################################################################################################################
+# StatsEmbed class:
+# used to display all of a user's stats
+################################################################################################################################################
+class StatsEmbed(Embed):
+    def __init__(self, stats: FullStats, user: User):
+        super().__init__(
+            color= Color.random(),
+            title= 'Stats')
+
+        self.add_field(name='Guess Distribution', value=stats.guess_distro, inline=False
+            ).add_field(name='Games Played', value=stats.games_played
+            ).add_field(name='Wins', value=stats.total_wins
+            ).add_field(name='Win Rate', value=f'{stats.win_rate:.02f}%'
+            ).add_field(name='Streak', value=stats.streak
+            ).add_field(name='Max Streak', value=stats.max_streak
+            ).add_field(name='Last Win', value=stats.last_win or 'Never'
+            ).add_field(name='Average Guesses', value=f'{stats.avg_guesses:.02f}'
+            ).add_field(name='Green Rate', value=f'{stats.green_rate:.02f}%'
+            ).add_field(name='Yellow Rate', value=f'{stats.yellow_rate:.02f}%'
+            ).set_footer(icon_url=user.display_avatar.url, text=user.display_name
+        )
+
+################################################################################################################################################
+# WindowStatsEmbed class:
+# used to display a user's stats for the current week, month or season
+################################################################################################################################################
+class WindowStatsEmbed(Embed):
+    def __init__(self, period: str, stats: WindowStats, user: User):
+        super().__init__(
+            color= Color.random(),
+            title= f'Stats this {period}',
+            description= f'{stats.first} to {stats.last}')
+
+        self.add_field(name='Games Played', value=stats.games
+            ).add_field(name='Wins', value=stats.wins
+            ).add_field(name='Win Rate', value=f'{stats.win_rate:.02f}%'
+            ).add_field(name='Average Guesses', value=f'{stats.avg_guesses:.02f}'
+            ).add_field(name='Green Rate', value=f'{stats.green_rate:.02f}%'
+            ).add_field(name='Yellow Rate', value=f'{stats.yellow_rate:.02f}%'
+            ).set_footer(icon_url=user.display_avatar.url, text=user.display_name
+        )
+
+################################################################################################################################################
+# LeaderboardEmbed class:
+# used to display the top players of a ranking
+################################################################################################################################################
+class LeaderboardEmbed(Embed):
+    def __init__(self, ranking: str, top: list[tuple[str, float]], rank: int | None, user: User):
+        title, show = RANKING_TITLES[ranking]
+        lines = [f'`{place:>2}.` {username}  ∙  {show(value)}' for place, (username, value) in enumerate(top, 1)]
+
+        super().__init__(
+            color= Color.random(),
+            title= f'Leaderboard: {title}',
+            description= '\n'.join(lines) or 'Nobody is ranked yet!')
+
+        # where the user stands, even if they are not on the board
+        self.set_footer(
+            icon_url=user.display_avatar.url,
+            text=f'{user.display_name}  ∙  ' + (f'#{rank}' if rank else 'not ranked yet'))
+
 ################################################################################################################################################
 # LinkView class:
 # used to display the wordle website in discord
@@ -83,31 +138,13 @@ class LinkView(View):
             style= ButtonStyle.link,
             url= 'https://www.nytimes.com/games/wordle/index.html'))
 
-################################################################################################################################################
-# GameStats class:
-# used to store stats of a submitted game
-################################################################################################################################################
-@dataclass
-class GameStats:
-    """Game stats DTO"""
-
-    guessTable: np.ndarray
-    numGuesses: int
-    solution: str
-    won: bool
-    uniqueCorrect: int
-    uniqueMisplaced: int
-    uniqueAll: int
-    totalCorrect: int
-    totalMisplaced: int
-
 ################################################################################################################################################
 # WordleBot class:
 # Driver code for the Wordle Bot
 ################################################################################################################################################
 class WordleBot(commands.Bot):
 
-    def __init__(self, server_id: int) -> None:
+    def __init__(self, server_id: int, logdb: LogUpdate = None) -> None:
 
         super().__init__(command_prefix='!', intents=Intents.all(), help_command=None)
 
@@ -115,11 +152,6 @@ class WordleBot(commands.Bot):
         gen_files()
 
         # Private members / constants
-        self._tessConfig = '--oem 3 --psm 6 -c tessedit_char_whitelist=ABCDEFGHIJKLMNOPQRSTUVWXYZ'
-        self._maxThresh = 255       # maximum pixel value
-        self._darkThresh = 0x26     # midpoint between the dark theme BG and the next darkest color
-        self._lightThresh = 0xeb    # midpoint between the light theme BG and the next brightest color
-        self._valid_words = get_valid_words()
         self._responses = {
             0: (r"You suck!",
                 r"I'd say better luck next time, but you clearly don't have any luck.",
@@ -141,189 +173,60 @@ class WordleBot(commands.Bot):
         # Public members
         self.synced = False
         self.guild = Object(id=server_id)
-        self.db = BotDatabase()
-        self.log = BotLog()
-
-
-    def _guessesFromImage(self, image: bytes) -> np.ndarray:
-        """Use Tesseract to compile a list of the guesses.
-        
-        ---
-        ## Parameters
-
-        image : `bytes`
-            The user-provided screenshot of their Wordle game.
-
-        ---
-        ## Returns
-
-        object : `np.ndarry`
-            A 2-D array of the words within the image.
-
-        ---
-        ## Raises
-
-        InvalidGame
-            Unable to find a game in the image."""
-
-        ### Get cell contours ###
-
-        # Convert image (bytes) to OpenCV matrix (cv2.Mat) and get grayscale
-        gray = cv2.cvtColor(
-            src= cv2.imdecode(np.frombuffer(image, np.uint8), cv2.IMREAD_COLOR),
-            code= cv2.COLOR_BGR2GRAY)
-
-        # Determine user theme and create a mask of the character cells so we can find their contours
-        image_sides = [*gray[:1,:], *gray[-1:,:]]   # Leftmost and rightmost columns of pixels
-        if np.median(image_sides) < 200:
-            _, cellmask = cv2.threshold(gray, self._darkThresh, self._maxThresh, cv2.THRESH_BINARY)
-        else:
-            _, cellmask = cv2.threshold(gray, self._lightThresh, self._maxThresh, cv2.THRESH_BINARY_INV)
-        contours, _ = cv2.findContours(cellmask, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
 
-        # Discard as many unreasonable contours as possible
-        filtered = []
-        for c in contours:
-            # Skip non-quadrilaterals
-            if c.shape != (4,1,2):
-                continue
-            
-            # Skip non-squares (rough estimate)
-            _,_,w,h = cv2.boundingRect(c)
-            if abs(w-h) > (w+h)*0.015:
-                continue
+        # Scoring pipeline. The pool forks its workers first, before the database opens its connection
+        # and starts its threads. They only inherit the log's connection, which they never use.
+        self.scorer = GameScorer()
+        self.pool = ScorePool(self.scorer)
 
-            filtered.append(c)
-
-        # Remove all axis of length one since they are useless
-        cell_contours = np.squeeze(filtered)
+        self.db = AsyncBotDatabase()
+        self.log = BotLog()
 
-        if len(cell_contours) != 30:
-            raise InvalidGame('Could not find the game!')
-        
-        # Generate a mask of the characters
-        _, charmask = cv2.threshold(gray, self._lightThresh, self._maxThresh, cv2.THRESH_BINARY_INV)
+        # Latency of every submission stage, stored in the log database once per window
+        self.logdb = logdb
+        self.latency = LatencyHistograms()
 
 
-        ### Transform charmask to increase legibility ###
+    def getResponse(self, solved: bool, numGuesses: int) -> str:
+        if not solved:
+            numGuesses = 0
 
-        # squeeze letters closer horizontally in reverse order since cv2.findContours works
-        # from SE to NW and we want our contours organized from NW to SE (i.e. guess order).
-        cols = []
-        for c in cell_contours[:5]:
-            x,_,w,_ = cv2.boundingRect(c)
-            off = w // 4
-            cols.append(charmask[:, x+off : x+w-off])
-        charmask = cv2.hconcat(cols[::-1])
+        return choice(self._responses[numGuesses])
 
-        # trim top and bottom edges of image
-        ys = set(
-            y
-            for contour in cell_contours
-            for (_, y) in contour)
-        charmask = charmask[min(ys):max(ys), :]
 
+    @tasks.loop(hours=6)
+    async def _prefetchWotd(self) -> None:
+        # keep upcoming words of the day cached so scoring never waits on the api
+        await to_thread(prefetch_wotd)
 
-        ### Get dem words ###
+    @tasks.loop(minutes=LATENCY_WINDOW)
+    async def _flushLatency(self) -> None:
+        # close the current latency window and store it
+        self.storeLatency()
 
-        # Generate mask and feed Tesseract :) *pat* *pat* good boy
-        text = image_to_string(image=charmask, lang='eng', config=self._tessConfig)
-        guess_list = text.strip().lower().split('\n')
+    def storeLatency(self) -> None:
+        histograms, hits = self.latency.drain()
+        if self.logdb and histograms:
+            self.logdb.update_latency(datetime.now(), histograms, hits)
 
-        # Validate guesses
-        if any(g not in self._valid_words for g in guess_list):
-            raise InvalidGame(f'Tesseract misidentified a word.\n  output = {guess_list}')
+    def recordLatency(self, trace: StageTrace) -> None:
+        self.latency.record(trace)
 
-        # Return guesses as 2-D numpy array
-        return np.array( [list(g) for g in guess_list] )
 
-    def getResponse(self, solved: bool, numGuesses: int) -> str:
-        if not solved:
-            numGuesses = 0
+    ### Overridden Discord Bot class methods
+    async def setup_hook(self):
 
-        return choice(self._responses[numGuesses])
+        # Start background tasks once the client has an event loop
+        self._prefetchWotd.start()
+        self._flushLatency.start()
 
-    def scoreGame(self, image: bytes, submissionDate: datetime) -> GameStats:
-        """Parse a screenshot of a Wordle game and return a GameStats object containing
-        information about the results.
-        
-        ---
-        ## Parameters
-
-        image : `bytes`
-            The user-provided screenshot of their Wordle game.
-
-        submissionDate : `datetime`
-            A datetime object respresenting the time of submission.
-
-        ---
-        ## Returns
-
-        object : `GameStats`
-        """
-
-        # Read user guesses
-        guesses = self._guessesFromImage(image)
-
-        # get word of the day as well as the wordle number
-        wotd, wrdl_num = get_wotd(submissionDate, wrdl_num=True)
-        orig_counts = Counter(wotd)
-
-        # Initialize scores
-        scores = np.full(shape=guesses.shape, fill_value=Score.INCORRECT)
-        uniques = [set() for _ in range(5)]
-        tC = tM = uC = uM = 0
-
-        # Score the game
-        # It's easier to score yellows after greens as opposed to "inline". Otherwise,
-        #   we would have to look ahead for potential greens because green has a higher
-        #   precedence and therefore consumes one of the characters counts before any
-        #   would-be yellows have the chance.
-        for row, guess in enumerate(guesses):
-            counts = orig_counts.copy()
-            remaining = []
-
-            # score CORRECT LETTERS in CORRECT POSITION (Green)
-            for col, (gc, wc) in enumerate(zip(guess, wotd)):
-                if gc == wc:
-                    scores[row,col] = Score.CORRECT
-                    counts[gc] -= 1
-                    tC += 1
-
-                    #(1/2) start adding unique chars...
-                    if gc not in uniques[col]:
-                        uC += 1
-                        uniques[col].add(gc)
-                else:
-                    remaining.append( (row, col, gc) )
-
-            # score CORRECT LETTERS in WRONG POSITION (Yellow)
-            for row, col, gc in remaining:
-                if gc in wotd and counts[gc] > 0:
-                    scores[row,col] = Score.MISPLACED
-                    counts[gc] -= 1
-                    tM += 1
-
-                    if gc not in uniques[col]:
-                        uM += 1
-
-                #(2/2) ...finish adding unique chars
-                uniques[col].add(gc)
-
-        return GameStats(
-            guessTable= guesses,
-            numGuesses= guesses.shape[0],
-            solution= wotd,
-            uniqueCorrect= uC,
-            uniqueMisplaced= uM,
-            totalCorrect= tC,
-            totalMisplaced= tM,
-            won= all(s == Score.CORRECT for s in scores[-1]),
-            uniqueAll= sum(len(set) for set in uniques)
-        )
+    async def close(self):
 
+        # Stop the scoring workers before the client shuts down, keeping the last latency window
+        self.pool.shutdown()
+        self.storeLatency()
+        await super().close()
 
-    ### Overridden Discord Bot class methods
     async def on_ready(self):
 
         # Wait for client cache to load
@@ -1,10 +1,12 @@
-from datetime import datetime
+from datetime import datetime, date, timedelta
 from typing import Tuple
-from requests import get
+from requests import get, RequestException
 from json import loads
 from re import search, findall
 from pickle import load, dump
-from os.path import exists
+from os import getpid, replace
+from os.path import exists, getmtime
+from threading import Lock
 
 # the last valid 5 letter word, this is used to locate the word list
 LAST_VALID_WORD = 'zymic'
@@ -13,29 +15,146 @@ LAST_VALID_WORD = 'zymic'
 WO_PATH = './lib/wordle_pickles/word_order.pkl'
 VW_PATH = './lib/wordle_pickles/valid_words.pkl'
 
-# gets the word of the day from the api endpoint
-def get_wotd(dtime:datetime=datetime.now(), wrdl_num:bool=False) -> str|Tuple[str, int]:
+# path to the pickle that stores every word of the day fetched so far
+WOTD_PATH = './lib/wordle_pickles/wotd_cache.pkl'
+
+# date of the first wordle, which is the first word in the word order
+FIRST_WORDLE = date(2021, 6, 19)
+
+# how many days past today to fetch ahead of time
+PREFETCH_DAYS = 7
+
+# seconds to wait on the wordle api before falling back to the word order
+WOTD_TIMEOUT = 5
+
+# solutions and wordle ids that have already been fetched, keyed by YYYY-MM-DD
+_wotd_cache: dict[str, Tuple[str, int]] = {}
+
+# modification time of WOTD_PATH when it was last read, so other processes' fetches are picked up
+_wotd_mtime = 0.0
+
+# guards writes to the cache from the prefetch thread
+_wotd_lock = Lock()
+
+# gets the word of the day, from the cache if possible and from the api endpoint otherwise
+def get_wotd(dtime:datetime=None, wrdl_num:bool=False) -> str|Tuple[str, int]|None:
     '''
     Returns word of the day\n
     ---
     #### If dtime parameter is left blank, the function will use the current day
     #### Otherwise datetime passed is used
 
-    #### If wrdl_num is set to True, the function will return the wotd and the wordle number in a tuple
+    #### If wrdl_num is set to True, the function will return the wotd and the wordle id in a tuple
+
+    #### If the api cannot be reached, the word is taken from the word order and the wordle id is None.
+    #### The word is None if the day is not in the word order either
     
     '''
+    # default to today, evaluated per call rather than once at import
+    dtime = dtime or datetime.now()
+
     # convert datetime to string in form YYYY-MM-DD
-    date = dtime.strftime('%Y-%m-%d')
-    
-    # send get request for JSON data
-    r = loads(get(f'https://www.nytimes.com/svc/wordle/v2/{date}.json').text)
+    key = dtime.strftime('%Y-%m-%d')
+
+    # look in memory first, then for entries written by other processes, then ask the api
+    if key not in _wotd_cache:
+        _sync_cache()
+    if key not in _wotd_cache:
+        try:
+            _fetch_wotd(key)
+        except (RequestException, ValueError, KeyError):
+            solution = _word_order_wotd(dtime)
+            return (solution, None) if wrdl_num else solution
 
     # if the caller wants the wordle number, return tuple
     if wrdl_num:
-        return r['solution'], r['id']
+        return _wotd_cache[key]
     
     # parse and return solution field
-    return r['solution']
+    return _wotd_cache[key][0]
+
+
+# gets the word of the day only if it has already been fetched
+def get_cached_wotd(dtime:datetime) -> str|None:
+    '''
+    Returns word of the day if it is cached, otherwise None. Never touches the network.
+    '''
+    key = dtime.strftime('%Y-%m-%d')
+    if key not in _wotd_cache:
+        _sync_cache()
+
+    solution = _wotd_cache.get(key)
+    return solution[0] if solution else None
+
+
+# fetch the words of the upcoming days so that submissions never wait on the api
+def prefetch_wotd(days:int=PREFETCH_DAYS) -> int:
+    '''
+    Caches the word of the day for today and the following days. Returns how many were fetched.
+    '''
+    today = datetime.now().date()
+    fetched = 0
+
+    for offset in range(days + 1):
+        day = today + timedelta(days=offset)
+        if get_cached_wotd(day) is not None:
+            continue
+
+        # the api only publishes a few days ahead, stop at the first day it does not have
+        try:
+            _fetch_wotd(day.strftime('%Y-%m-%d'))
+            fetched += 1
+        except (RequestException, ValueError, KeyError):
+            break
+
+    return fetched
+
+
+# request a word of the day from the api and store it in the cache
+def _fetch_wotd(key:str) -> None:
+    r = get(f'https://www.nytimes.com/svc/wordle/v2/{key}.json', timeout=WOTD_TIMEOUT)
+    r.raise_for_status()
+    r = loads(r.text)
+
+    with _wotd_lock:
+        # merge in anything other processes stored since we last read the file, then write it back
+        _sync_cache()
+        _wotd_cache[key] = r['solution'], r['id']
+        _store_wotd_cache()
+
+
+# reload the cache file if another process has written to it
+def _sync_cache() -> None:
+    global _wotd_mtime
+
+    try:
+        mtime = getmtime(WOTD_PATH)
+    except OSError:
+        return
+
+    if mtime != _wotd_mtime:
+        _wotd_cache.update(_load_pkl(WOTD_PATH))
+        _wotd_mtime = mtime
+
+
+# write the cache file, atomically so readers in other processes never see half a pickle
+def _store_wotd_cache() -> None:
+    global _wotd_mtime
+
+    tmp_path = f'{WOTD_PATH}.{getpid()}'
+    _store_pkl(dict(_wotd_cache), tmp_path)
+    replace(tmp_path, WOTD_PATH)
+    _wotd_mtime = getmtime(WOTD_PATH)
+
+
+# best guess at the word of the day when the api is unreachable, None for days outside the word order
+def _word_order_wotd(dtime:datetime) -> str|None:
+    day = dtime.date() if isinstance(dtime, datetime) else dtime
+    order = get_word_order()
+    index = (day - FIRST_WORDLE).days
+
+    # a negative index would wrap around to the end of the list
+    return order[index] if 0 <= index < len(order) else None
 
 
 # return the list of valid words
@@ -79,14 +198,14 @@ def _get_word_banks() -> Tuple[list, frozenset]:
 
     
 # load in pickle file
-def _load_pkl(path:str) -> frozenset|list:
+def _load_pkl(path:str) -> frozenset|list|dict:
     # load in set from pickle file and return
     with open(path, 'rb') as f:
         return load(f)
 
 
 # store object as a pickle file
-def _store_pkl(s:frozenset|list, path:str) -> None:
+def _store_pkl(s:frozenset|list|dict, path:str) -> None:
     # open the file path to write the pickle data
     with open(path, 'wb') as f:
         # write the pickled data to file_path
@@ -1,53 +1,111 @@
 #!./venv/bin/python3.10
 from lib import *
 
+async def _reply_error(interaction: Interaction, message: str) -> None:
+
+    # If the response was deferred, drop the "thinking" message so the
+    # error can be sent privately to the user.
+    if interaction.response.is_done():
+        await interaction.delete_original_response()
+        await interaction.followup.send(content=message, ephemeral=True)
+    else:
+        await interaction.response.send_message(content=message, ephemeral=True)
+
 async def _submit(bot:WordleBot, image:Attachment, interaction: Interaction) -> str:
-    
-    # Grab date of submission and try to score the game. If the game
-    # cannot be processed, reply with an error message and return.
-    date = interaction.created_at.astimezone().date()
-    game = bot.scoreGame(await image.read(), date)
-    
+
+    # Time every stage of the submission, whether or not it succeeds
+    trace = StageTrace()
+    try:
+        # Scoring can take longer than discord allows for a response,
+        # so acknowledge the command before handing the game to the pool.
+        with trace.span('defer'):
+            await interaction.response.defer(thinking=True)
+
+        # Grab date of submission and try to score the game. If the game
+        # cannot be processed, reply with an error message and return.
+        date = interaction.created_at.astimezone().date()
+        with trace.span('download'):
+            data = await image.read()
+
+        try:
+            with trace.span('score'):
+                game = await bot.pool.score(data, date)
+        except InvalidGame as e:
+            trace.extend(e.stages)
+            raise
+        trace.extend(game.stages)
+
+        return await _record(bot, game, date, interaction, trace, image)
+
+    finally:
+        bot.recordLatency(trace)
+
+async def _share(bot:WordleBot, text:str, interaction: Interaction) -> str:
+
+    # Time every stage of the submission, whether or not it succeeds
+    trace = StageTrace()
+    try:
+        # Share text is parsed on the spot, no image processing involved.
+        # If it cannot be parsed, reply with an error message and return.
+        date = interaction.created_at.astimezone().date()
+        with trace.span('share'):
+            game = bot.scorer.scoreShare(text, date)
+
+        return await _record(bot, game, date, interaction, trace)
+
+    finally:
+        bot.recordLatency(trace)
+
+async def _record(bot:WordleBot, game:GameStats, date, interaction: Interaction, trace:StageTrace, image:Attachment=None) -> str:
 
     # Submit scores to database. If the user has already submit
     # today, then reply with an error message and return.
-    baseStats, event = bot.db.submit_data(
-        username= str(interaction.user),
-        dtime= date,
-        win= game.won,
-        guesses= game.numGuesses,
-        greens= game.uniqueCorrect,
-        yellows= game.uniqueMisplaced,
-        uniques= game.uniqueAll)
+    with trace.span('database'):
+        baseStats, event = await bot.db.submit_data(
+            username= str(interaction.user),
+            dtime= date,
+            win= game.won,
+            guesses= game.numGuesses,
+            greens= game.uniqueCorrect,
+            yellows= game.uniqueMisplaced,
+            uniques= game.uniqueAll,
+            guess_table= game.guessTable,
+            score_table= game.scoreTable)
         
     
-    # Reply to user's submission with stats.
-    await interaction.response.send_message(
-        file= await image.to_file(),
-        embed= SubmissionEmbed(
-            date= date,
-            user= interaction.user,
-            attachment_filename= image.filename,
-            stats= baseStats))
-
-    await interaction.followup.send(
-        content= bot.getResponse(
-            solved= game.won,
-            numGuesses= game.numGuesses),
-        ephemeral= True)
+    # Reply to user's submission with stats. Screenshots are posted
+    # back with the stats, shares are drawn in the embed.
+    embed = SubmissionEmbed(
+        date= date,
+        user= interaction.user,
+        attachment_filename= image.filename if image else None,
+        stats= baseStats,
+        game= game)
+
+    with trace.span('reply'):
+        if image:
+            await interaction.followup.send(file= await image.to_file(), embed= embed)
+        else:
+            await interaction.response.send_message(embed= embed)
+
+        await interaction.followup.send(
+            content= bot.getResponse(
+                solved= game.won,
+                numGuesses= game.numGuesses),
+            ephemeral= True)
 
     # return the event (submit, new)
     return event
 
 def main() -> None:
 
-    # initialize WordleBot
-    bot = WordleBot(server_id)
-    slash_cmd = bot.tree.command
-
     # initialize log
     log = LogUpdate()
 
+    # initialize WordleBot, it stores its stage latencies in the log
+    bot = WordleBot(server_id, log)
+    slash_cmd = bot.tree.command
+
     # command to submit a game
     @slash_cmd(description='Submit a screenshot of your Wordle game!', guild=bot.guild)
     async def submit(interaction: Interaction, image: Attachment) -> None:
@@ -73,19 +131,76 @@ def main() -> None:
         except InvalidGame as e:
             # update log about invalid game
             log.update(dtime, user, 'invalid', f'{user} submitted invalid game')
-            return await interaction.response.send_message(content=e.message, ephemeral=True)
+            return await _reply_error(interaction, e.message)
+
+        # log ScorerBusy
+        except ScorerBusy as e:
+            # update log about the pool turning the game away
+            log.update(dtime, user, 'busy', f'{user} submitted while scorer was busy')
+            return await _reply_error(interaction, e.message)
+
+
+        # log DoubleSubmit
+        except DoubleSubmit as e:
+            # update log about double submit
+            log.update(dtime, user, 'doublesub', f'{user} attempted double submit')
+            return await _reply_error(interaction, e.message)
+
+        # log un-handled exception
+        except:
+            exc_type, _, exc_traceback = exc_info()
+            log.update(dtime, user, 'exception', f'{exc_type.__name__} raised', traceback=exc_traceback)
+
+            # the response was deferred, so the user is told rather than left on "thinking". The error
+            # is already logged, so a reply that fails too is ignored
+            try:
+                await _reply_error(interaction, 'Something went wrong while submitting your game, try again later.')
+            except Exception:
+                pass
+    
+    # command to submit a game from Wordle's share text
+    @slash_cmd(description='Submit your Wordle game by pasting its share text!', guild=bot.guild)
+    async def share(interaction: Interaction, text: str) -> None:
+
+        # get exact time of command and the user 
+        user = str(interaction.user)
+        dtime = datetime.now()
+
+        try:
+            # try to submit game
+            # update the database and return the event type
+            event = await _share(bot, text, interaction)
 
+            # check if the user is new
+            if event == 'new':
+                log.update(dtime, user, event, f'{user} added as new user')
+                event = 'submit'
+
+            # log submitted game
+            log.update(dtime, user, event, f'{user} submitted game by share')
+
+        # log InvalidGame
+        except InvalidGame as e:
+            # update log about invalid game
+            log.update(dtime, user, 'invalid', f'{user} submitted invalid game')
+            return await _reply_error(interaction, e.message)
 
         # log DoubleSubmit
         except DoubleSubmit as e:
             # update log about double submit
             log.update(dtime, user, 'doublesub', f'{user} attempted double submit')
-            return await interaction.response.send_message(content=e.message, ephemeral=True)
+            return await _reply_error(interaction, e.message)
 
         # log un-handled exception
         except:
             exc_type, _, exc_traceback = exc_info()
             log.update(dtime, user, 'exception', f'{exc_type.__name__} raised', traceback=exc_traceback)
+
+            # the user is told, unless the reply fails too (the error is already logged)
+            try:
+                await _reply_error(interaction, 'Something went wrong while submitting your game, try again later.')
+            except Exception:
+                pass
     
     # command to get wordle link
     @slash_cmd(description='Get the link to the Wordle webpage.', guild=bot.guild)
@@ -106,6 +221,57 @@ def main() -> None:
             exc_type, _, exc_traceback = exc_info()
             log.update(dtime, user, 'exception', f'{exc_type.__name__} raised', traceback=exc_traceback)
 
+    # command to show a user's stats
+    @slash_cmd(description='See all of your Wordle stats!', guild=bot.guild)
+    async def stats(interaction: Interaction, period: Literal['all', 'week', 'month', 'season'] = 'all') -> None:
+
+        # get exact time of command and the user 
+        user = str(interaction.user)
+        dtime = datetime.now()
+
+        try:
+            # the current week, month or season is kept up to date on every submission
+            if period != 'all':
+                periodStats = await bot.db.get_period_stats(user, period, interaction.created_at.astimezone().date())
+                await interaction.response.send_message(embed= WindowStatsEmbed(period, periodStats, interaction.user), ephemeral= True)
+                return log.update(dtime, user, 'stats', f'{user} requested stats this {period}')
+
+            # stats are read without blocking, and kept until the user submits again
+            fullStats = await bot.db.get_full_stats(user)
+            if fullStats is None:
+                return await _reply_error(interaction, 'You have not submitted any games yet!')
+
+            await interaction.response.send_message(embed= StatsEmbed(fullStats, interaction.user), ephemeral= True)
+            log.update(dtime, user, 'stats', f'{user} requested stats')
+
+        # log un-handled exception
+        except:
+            exc_type, _, exc_traceback = exc_info()
+            log.update(dtime, user, 'exception', f'{exc_type.__name__} raised', traceback=exc_traceback)
+
+    # command to show the leaderboard
+    @slash_cmd(description='See who is on top of the Wordle leaderboard!', guild=bot.guild)
+    async def leaderboard(interaction: Interaction, ranking: Literal['win_rate', 'avg_guesses', 'streak', 'max_streak'] = 'win_rate') -> None:
+
+        # get exact time of command and the user 
+        user = str(interaction.user)
+        dtime = datetime.now()
+
+        try:
+            # rankings are kept in memory, so the board is ready right away
+            embed = LeaderboardEmbed(
+                ranking= ranking,
+                top= bot.db.get_leaderboard(ranking),
+                rank= bot.db.get_rank(ranking, user),
+                user= interaction.user)
+            await interaction.response.send_message(embed= embed)
+            log.update(dtime, user, 'leaderboard', f'{user} requested {ranking} leaderboard')
+
+        # log un-handled exception
+        except:
+            exc_type, _, exc_traceback = exc_info()
+            log.update(dtime, user, 'exception', f'{exc_type.__name__} raised', traceback=exc_traceback)
+
     @slash_cmd(description='Roll an N-sided die!', guild=bot.guild)
     async def roll(interaction: Interaction, faces: app_commands.Range[int, 2, None]) -> None:
         
@@ -0,0 +1,113 @@
+from asyncio import run, gather
+from datetime import date, datetime, timedelta
+from os import makedirs, remove
+from os.path import dirname, join, abspath
+from sys import path
+
+path.append(join(dirname(dirname(abspath(__file__))), 'lib'))
+
+import pytest
+import botdatabase
+from botdatabase import AsyncBotDatabase, BaseStats, DoubleSubmit, IncompleteHistory
+
+
+@pytest.fixture(autouse=True)
+def database_dir(tmp_path, monkeypatch):
+    # every test gets a database of its own
+    makedirs(tmp_path / 'lib' / 'bot_database')
+    monkeypatch.chdir(tmp_path)
+
+
+def _submission(username:str, day:int) -> tuple:
+    return (username, datetime(2023, 1, day), True, 3, 2, 1, 5)
+
+
+def test_group_commits_once():
+    db = AsyncBotDatabase(group_window=0.05)
+    statements = []
+    db.sync._database.set_trace_callback(statements.append)
+
+    async def submit_all():
+        return await gather(*(db.submit_data(*_submission(f'user{i}', 1)) for i in range(8)))
+
+    results = run(submit_all())
+    db.close_connection()
+
+    assert all(isinstance(result[0], BaseStats) for result in results)
+    assert [s for s in statements if s.startswith('BEGIN')] == ['BEGIN IMMEDIATE;']
+    assert [s for s in statements if s.startswith('COMMIT')] == ['COMMIT']
+
+
+def test_submit_reads_inside_transaction():
+    db = botdatabase.BotDatabase()
+    statements = []
+    db._database.set_trace_callback(statements.append)
+
+    db.submit_data(*_submission('a', 1))
+    db.close_connection()
+
+    # the user's row is read after the transaction begins, not before
+    reads = [i for i, s in enumerate(statements) if s.lstrip().startswith('SELECT')]
+    assert statements[0] == 'BEGIN IMMEDIATE;' and reads and reads[0] > 0
+    assert [s for s in statements if s.startswith(('BEGIN', 'COMMIT'))] == ['BEGIN IMMEDIATE;', 'COMMIT']
+
+
+def test_group_isolates_failures():
+    db = botdatabase.BotDatabase()
+    db.submit_data(*_submission('a', 1))
+
+    results = db.submit_group([_submission('a', 1), _submission('b', 1), _submission('a', 2)])
+
+    assert isinstance(results[0], DoubleSubmit)
+    assert results[1][1] == 'new' and results[2][1] == 'submit'
+    assert not db._database.in_transaction
+    assert db.get_full_stats('a').games_played == 2
+    db.close_connection()
+
+
+def test_merge_rebuilds_history():
+    # the same games, submitted in order and merged out of order, give the same totals
+    days = [3, 1, 2, 4]
+    ordered = botdatabase.BotDatabase()
+    for day in sorted(days):
+        ordered.submit_data(*_submission('a', day))
+    expected = vars(ordered.get_full_stats('a'))
+    ordered.close_connection()
+
+    for name in ('stats.db', 'leaderboard.pickle'):
+        remove(join('lib', 'bot_database', name))
+
+    db = botdatabase.BotDatabase()
+    db.submit_data(*_submission('a', 4))
+    results = db.merge_games('a', [_submission('a', day) for day in days])
+
+    assert [type(result) for result in results] == [tuple, tuple, tuple, DoubleSubmit]
+    assert vars(db.get_full_stats('a')) == expected
+    assert db.leaderboard.top('max_streak') == [('a', 4)]
+    db.close_connection()
+
+
+def test_merge_needs_daily_history():
+    db = botdatabase.BotDatabase()
+    db.submit_data(*_submission('a', 5))
+    db._database.execute('DELETE FROM Daily;')
+    db._database.commit()
+
+    with pytest.raises(IncompleteHistory):
+        db.merge_games('a', [_submission('a', 1)])
+    assert db.get_full_stats('a').games_played == 1
+    db.close_connection()
+
+
+@pytest.mark.parametrize('first_month', range(1, 13))
+def test_season_start(first_month, monkeypatch):
+    monkeypatch.setattr(botdatabase, 'SEASON_FIRST_MONTH', first_month)
+
+    # every day of two years falls in the season starting on the last season month before it
+    for offset in range(731):
+        day = date(2023, 1, 1) + timedelta(days=offset)
+        start = botdatabase.period_start('season', day)
+        months = (day.year - start.year) * 12 + day.month - start.month
+
+        assert start.day == 1 and 0 <= months < botdatabase.SEASON_MONTHS
+        assert (start.month - first_month) % botdatabase.SEASON_MONTHS == 0
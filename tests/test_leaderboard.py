@@ -0,0 +1,33 @@
+from datetime import date, timedelta
+from os.path import dirname, join, abspath
+from sys import path
+
+path.append(join(dirname(dirname(abspath(__file__))), 'lib'))
+
+from leaderboard import Leaderboard
+
+
+class Record:
+    def __init__(self, curr_streak:int, last_win:date) -> None:
+        self.games, self.wins, self.guesses = 10, 10, 40
+        self.curr_streak = self.max_streak = curr_streak
+        self.last_win = int(last_win.strftime('%Y%m%d'))
+
+
+def test_lapsed_streaks_drop_off():
+    today = date.today()
+    board = Leaderboard()
+    board.update('current', Record(3, today))
+    board.update('yesterday', Record(9, today - timedelta(days=1)))
+
+    assert board.top('streak') == [('yesterday', 9), ('current', 3)]
+
+    # a day later the streak from yesterday has lapsed, but its best streak still counts
+    tomorrow = today + timedelta(days=1)
+    assert board.top('streak', today=tomorrow) == [('current', 3)]
+    assert board.rank('streak', 'yesterday', today=tomorrow) is None
+    assert board.rank('max_streak', 'yesterday', today=tomorrow) == 1
+
+    # a streak that has already lapsed is never added
+    board.update('old', Record(5, today - timedelta(days=5)))
+    assert board.rank('streak', 'old', today=tomorrow) is None